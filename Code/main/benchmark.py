@@ -0,0 +1,169 @@
+import numpy as np
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+from draw import Draw
+from raster import line2point,density,segment_density
+from intersection import find_intersections
+from similarity_metrics import similarity_metrics
+
+#性能测试：在不同画布大小、组数、裂隙数下对各热点函数计时，记录吞吐量和内存峰值，并可与保存的基线比较。
+#用法：python benchmark.py [--ladders size traces] [--save baseline.json] [--compare [baseline.json]]
+#--compare不给文件名时与仓库中的benchmark_baseline.json比较。
+
+#每条阶梯只改变一个量，其余两个固定：(画布边长, 组数, 每组裂隙数)
+LADDERS={'size':[(60,3,150),(100,3,150),(200,3,150),(400,3,150)],
+         'sets':[(200,1,300),(200,2,300),(200,3,300),(200,5,300)],
+         'traces':[(200,3,100),(200,3,300),(200,3,1000),(200,3,2000)]}
+
+def case_name(size,sets,number):
+    return "s%d-g%d-n%d" % (size,sets,number)
+
+CASES={case_name(*case):case for ladder in LADDERS.values() for case in ladder}   #各阶梯共有的一级只算一次
+SEEDS=(5,6)                                                                     #两张图的固定随机种子
+BASELINE=os.path.join(os.path.dirname(os.path.abspath(__file__)),'benchmark_baseline.json')
+
+def make_configs(sets,number,shift=0):                                         #固定的各组参数，shift用于第二张图
+    return [{'name':'set'+str(k+1),
+             'spacing':2+k%2,
+             'theta':(k*180/sets+25+shift)%180,
+             'number':number,
+             'length':4+2*k+shift/10,
+             'theta_dispersion':20} for k in range(sets)]
+
+def make_maps(case):
+    size,sets,number=CASES[case]
+    maps=[]
+    for seed,shift in zip(SEEDS,(0,10)):
+        crack_map=Draw((size,size),seed=seed)
+        crack_map.generate_crack(make_configs(sets,number,shift))
+        maps.append(crack_map)
+    return maps
+
+def _fingerprint(value):                                                        #结果的数值摘要，用于检查优化是否改变了结果
+    if isinstance(value,dict):
+        return _fingerprint([v for _,v in sorted(value.items()) if not isinstance(v,(str,tuple))])
+    if isinstance(value,(list,tuple)):
+        return float(sum(_fingerprint(v) for v in value))
+    if value is None:
+        return 0.0
+    value=np.asarray(value,dtype=np.float64)
+    return float(np.nansum(value))
+
+def benchmarks(case):
+    """返回[(名称, 处理的裂隙数, 无参函数), ...]；每个函数返回用于摘要的结果。"""
+    size,sets,number=CASES[case]
+    map1,map2=make_maps(case)
+    metrics=similarity_metrics(map1,map2)
+    points=line2point(size,size,map1,10,'False')
+    n=len(map1.cracks)
+
+    def generate():
+        crack_map=Draw((size,size),seed=SEEDS[0])
+        crack_map.generate_crack(make_configs(sets,number))
+        return len(crack_map.cracks)
+
+    def uncached(func):                                                         #每次运行前清掉两张图的排序样本缓存，计入取样和排序的时间
+        def run():
+            for crack_map in (map1,map2):
+                crack_map.__dict__.pop('_sorted_samples',None)
+            return func()
+        return run
+
+    return [('generate_crack',n,generate),
+            ('line2point',n,lambda: line2point(size,size,map1,10,'False')),
+            ('density',n,lambda: density(size,size,points,0.2)),
+            ('segment_density',n,lambda: segment_density(size,size,map1.cracks.endpoints,0.2)),
+            ('intersections',n,lambda: len(find_intersections(map1.cracks)[0])),
+            ('group_coupling',n,metrics.group_coupling),
+            ('group_comprasion',n,metrics.group_comprasion),
+            ('direction_comprasion',n,uncached(metrics.direction_comprasion)),
+            ('length_comprasion',n,uncached(metrics.length_comprasion)),
+            ('length_comprasion_by_group',n,uncached(metrics.length_comprasion_by_group)),
+            ('spacing_comprasion',n,metrics.spacing_comprasion),
+            ('spacing_comprasion_by_group',n,metrics.spacing_comprasion_by_group),
+            ('density_comprasion',n,lambda: metrics.density_comprasion(0.1)),
+            ('density_comprasion_by_group',n,lambda: metrics.density_comprasion_by_group(0.1)),
+            ('density_comprasion_matrix',n,metrics.density_comprasion_matrix),
+            ('density_comprasion_multiscale',n,metrics.density_comprasion_multiscale),
+            ('density_gravityCenter_comprasion',n,lambda: metrics.density_gravityCenter_comprasion(6,10)),
+            ('density_gravityCenter_comprasion_by_group',n,lambda: metrics.density_gravityCenter_comprasion_by_group(6,10)),
+            ('cluster_comprasion',n,lambda: [c['count'] for c in metrics.cluster_comprasion(1,'kmeans')]),
+            ('score',n,uncached(lambda: similarity_metrics(map1,map2).score()['score']))]
+
+def measure(func,repeat=5,min_time=0.2):
+    """先运行一次预热并记录内存峰值，再重复计时；返回中位数、最小值（秒）、内存峰值（KB）和结果摘要。"""
+    tracemalloc.start()
+    value=func()
+    peak=tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    times=[]
+    start=time.perf_counter()
+    while len(times)<repeat or (time.perf_counter()-start<min_time and len(times)<100):
+        t=time.perf_counter()
+        func()
+        times.append(time.perf_counter()-t)
+    return {'median':float(np.median(times)),'min':float(np.min(times)),'runs':len(times),
+            'peak_kb':peak/1024,'value':_fingerprint(value)}
+
+def run(cases,repeat=5,only=None):
+    results={}
+    for case in cases:
+        results[case]={}
+        for name,n,func in benchmarks(case):
+            if only and name not in only:
+                continue
+            r=measure(func,repeat)
+            r['throughput']=n/r['median'] if r['median']>0 else float('inf')     #每秒处理的裂隙数
+            results[case][name]=r
+            print("%-14s %-42s %10.3f ms %12.0f traces/s %10.0f KB" % (case,name,r['median']*1e3,r['throughput'],r['peak_kb']))
+            sys.stdout.flush()
+    return {'meta':{'python':platform.python_version(),'numpy':np.__version__,'machine':platform.machine(),
+                    'repeat':repeat},
+            'results':results}
+
+def compare(current,baseline,tolerance=0.25):
+    """与基线比较：最短耗时超过基线(1+tolerance)倍记为变慢，结果摘要不同记为结果改变。返回问题列表。
+
+    最短耗时受系统负载的影响比中位数小，比较用最短耗时。
+    """
+    problems=[]
+    for case,benches in current['results'].items():
+        for name,r in benches.items():
+            base=baseline['results'].get(case,{}).get(name)
+            if base is None:
+                continue
+            ratio=r['min']/base['min'] if base['min']>0 else 1.0
+            if ratio>1+tolerance:
+                problems.append("%s/%s: %.2fx slower (%.3f ms -> %.3f ms)" % (case,name,ratio,base['min']*1e3,r['min']*1e3))
+            if not np.isclose(r['value'],base['value'],rtol=1e-6,atol=1e-9,equal_nan=True):
+                problems.append("%s/%s: result changed (%r -> %r)" % (case,name,base['value'],r['value']))
+    return problems
+
+if __name__ =='__main__':
+    parser=argparse.ArgumentParser(description="Benchmark the fracture map hot paths.")
+    parser.add_argument('--ladders',nargs='+',default=list(LADDERS),choices=list(LADDERS))
+    parser.add_argument('--cases',nargs='+',choices=list(CASES),help="individual cases; overrides --ladders")
+    parser.add_argument('--only',nargs='+',help="benchmark names to run")
+    parser.add_argument('--repeat',type=int,default=5)
+    parser.add_argument('--save',help="write results to this JSON file")
+    parser.add_argument('--compare',nargs='?',const=BASELINE,help="baseline JSON file to compare against (default: benchmark_baseline.json)")
+    parser.add_argument('--tolerance',type=float,default=0.25)
+    args=parser.parse_args()
+
+    cases=args.cases or list(dict.fromkeys(case_name(*case) for ladder in args.ladders for case in LADDERS[ladder]))
+    results=run(cases,args.repeat,args.only)
+    if args.save:
+        with open(args.save,'w',encoding='utf-8') as f:
+            json.dump(results,f,indent=1)
+    if args.compare:
+        with open(args.compare,encoding='utf-8') as f:
+            problems=compare(results,json.load(f),args.tolerance)
+        for problem in problems:
+            print(problem)
+        sys.exit(1 if problems else 0)
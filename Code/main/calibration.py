@@ -0,0 +1,154 @@
+import numpy as np
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from draw import Draw
+from similarity_metrics import map_features,score_features
+
+#DFN参数标定：在generate_crack的参数空间中搜索与实测图最相似的参数。
+#搜索方法为对角协方差的(mu,lambda)进化策略，参数先归一化到[0,1]；
+#每个候选先各生成一张图粗筛，明显落后的候选不再生成其余的重复图（提前淘汰）。
+
+#进程池中各子进程共享的实测图特征，由_init_worker设置一次
+_OBSERVED=None
+_WEIGHTS=None
+_FEATURE_KWARGS=None
+
+def _init_worker(observed,weights,feature_kwargs):
+    global _OBSERVED,_WEIGHTS,_FEATURE_KWARGS
+    _OBSERVED,_WEIGHTS,_FEATURE_KWARGS=observed,weights,feature_kwargs
+
+def _evaluate(args):                                                            #生成一张图并与实测图比较
+    configs,canvas_size,seed_seq=args
+    crack_map=Draw(canvas_size,seed=seed_seq)
+    crack_map.generate_crack(configs)
+    return score_features(_OBSERVED,map_features(crack_map,**_FEATURE_KWARGS),_WEIGHTS)['score']
+
+class parameter_space():
+    """由模板configs给出的参数空间：值为(下限,上限)的参数参与搜索，其余参数保持不变。
+
+    例如 [{'name':'set1','spacing':(2,8),'theta':(40,100),'number':50,'length':(3,12)}, ...]；
+    number取整。
+    """
+    def __init__(self,template):
+        self.template=[dict(config) for config in template]
+        self.keys=[(k,key) for k,config in enumerate(self.template) for key,value in config.items()
+                   if isinstance(value,(tuple,list)) and len(value)==2]
+        self.lower=np.array([self.template[k][key][0] for k,key in self.keys],dtype=np.float64)
+        self.upper=np.array([self.template[k][key][1] for k,key in self.keys],dtype=np.float64)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def configs(self,u):                                                        #[0,1]内的归一化参数 -> generate_crack的configs
+        values=self.lower+np.clip(u,0,1)*(self.upper-self.lower)
+        configs=[dict(config) for config in self.template]
+        for (k,key),value in zip(self.keys,values):
+            configs[k][key]=int(round(value)) if key=='number' else float(value)
+        return configs
+
+def _read_journal(path):
+    records=[]
+    if path is not None and os.path.exists(path):
+        with open(path,encoding='utf-8') as f:
+            for line in f:
+                line=line.strip()
+                if line:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:                                          #中断时写了一半的最后一行
+                        break
+    return records
+
+def calibrate(observed,template,canvas_size=None,population=16,parents=4,replicates=3,generations=30,
+              sigma=0.3,seed=None,processes=None,journal=None,patience=5,tol=1e-3,weights=None,**feature_kwargs):
+    """搜索使模拟图与实测图综合相似度（score_features的score，多张重复图取平均）最大的参数。
+
+    observed为实测的Draw图；template见parameter_space。
+    每代生成population个候选，取最好的parents个更新均值和步长；
+    每个候选先生成1张图，得分不低于本代第parents好的候选才补足replicates张。
+    连续patience代最好得分的提高不超过tol时停止。
+    journal为JSONL文件路径，每评价一个候选、每结束一代各追加一行；再次调用时从中恢复，已完成的代不再计算。
+    返回{'configs','score','generation','history'}。
+    """
+    space=parameter_space(template)
+    canvas_size=(observed.x_max,observed.y_max) if canvas_size is None else canvas_size
+    observed_features=map_features(observed,**feature_kwargs)
+    root=np.random.SeedSequence(seed)
+    processes=os.cpu_count() if processes is None else processes
+
+    #从日志恢复
+    mean,step=np.full(len(space),0.5),np.full(len(space),sigma)
+    best={'score':-np.inf,'u':None,'generation':-1}
+    history=[]
+    start=0
+    done={}                                                                     #(代,候选) -> 已有的得分，用于续算中断的一代
+    for record in _read_journal(journal):
+        if record['type']=='generation':
+            mean,step=np.array(record['mean']),np.array(record['sigma'])
+            history.append(record['best_score'])
+            if record['best_score']>best['score']:
+                best={'score':record['best_score'],'u':np.array(record['best_u']),'generation':record['generation']}
+            start=record['generation']+1
+        elif record['type']=='candidate':
+            done[(record['generation'],record['candidate'])]=record['scores']
+    log=open(journal,'a',encoding='utf-8') if journal is not None else None
+    pool=ProcessPoolExecutor(processes,initializer=_init_worker,initargs=(observed_features,weights,feature_kwargs)) if processes>1 else None
+    if pool is None:
+        _init_worker(observed_features,weights,feature_kwargs)
+    run=pool.map if pool is not None else map
+
+    def write(record):
+        if log is not None:
+            log.write(json.dumps(record)+'\n')
+            log.flush()
+
+    try:
+        for generation in range(start,generations):
+            if len(history)>patience and max(history[-patience:])-max(history[:-patience])<=tol:
+                break
+            #第generation代的随机数只取决于seed和代号，续算时结果不变
+            gen_seq=np.random.SeedSequence(root.entropy,spawn_key=root.spawn_key+(generation,))
+            rng=np.random.default_rng(gen_seq)
+            U=np.clip(mean+step*rng.standard_normal((population,len(space))),0,1)
+            configs=[space.configs(u) for u in U]
+            seeds=[np.random.SeedSequence(gen_seq.entropy,spawn_key=gen_seq.spawn_key+(i,)).spawn(replicates) for i in range(population)]
+            scores=[list(done.get((generation,i),[])) for i in range(population)]
+
+            def evaluate(todo):                                                 #todo: [(候选, 重复图序号), ...]，一次交给进程池
+                tasks=[(configs[i],canvas_size,seeds[i][r]) for i,r in todo]
+                for (i,r),score in zip(todo,run(_evaluate,tasks)):
+                    scores[i].append(score)
+
+            #粗筛：每个候选1张图
+            evaluate([(i,0) for i in range(population) if not scores[i]])
+            threshold=np.sort([s[0] for s in scores])[::-1][min(parents,population)-1]
+            #补足：只给排在前面的候选
+            evaluate([(i,r) for i in range(population) if scores[i][0]>=threshold
+                      for r in range(len(scores[i]),replicates)])
+            for i in range(population):
+                if (generation,i) not in done:
+                    write({'type':'candidate','generation':generation,'candidate':i,'u':U[i].tolist(),
+                           'configs':configs[i],'scores':scores[i]})
+
+            #提前淘汰的候选只有1张图，不参与选择
+            mean_score=np.array([np.mean(s) if len(s)==replicates else -np.inf for s in scores])
+            order=np.argsort(-mean_score)[:parents]
+            elite=U[order]
+            mean=elite.mean(axis=0)
+            step=np.maximum(np.sqrt(((elite-mean)**2).mean(axis=0)),1e-3)      #交叉熵式的步长更新，下限防止过早收敛
+            if mean_score[order[0]]>best['score']:
+                best={'score':float(mean_score[order[0]]),'u':U[order[0]],'generation':generation}
+            history.append(float(mean_score[order[0]]))
+            write({'type':'generation','generation':generation,'mean':mean.tolist(),'sigma':step.tolist(),
+                   'best_score':history[-1],'best_u':U[order[0]].tolist()})
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        if log is not None:
+            log.close()
+    return {'configs':space.configs(best['u']) if best['u'] is not None else None,
+            'score':best['score'],
+            'generation':best['generation'],
+            'history':history}
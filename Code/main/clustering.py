@@ -0,0 +1,90 @@
+import numpy as np
+
+#聚类后端注册表：CLUSTERERS[名称]=clusterer(points,max_memory,**kwargs)，返回每个点的类别号（-1为噪声点）
+CLUSTERERS={}
+DEFAULT_MAX_MEMORY=256*2**20                                                    #默认内存上限256MB
+
+def register_clusterer(*names):                                                 #注册新的聚类方法，可用作装饰器
+    def decorator(func):
+        for name in names:
+            CLUSTERERS[name]=func
+        return func
+    return decorator
+
+def cluster_points(points,backend='affinity',max_memory=DEFAULT_MAX_MEMORY,**kwargs):
+    """对(N,2)点阵聚类，返回{'points','labels','centers','sizes','count'}。
+
+    centers为各类成员的平均位置(count,2)，sizes为各类的点数(count,)，labels为-1的噪声点不计入任何一类。
+    """
+    if backend not in CLUSTERERS:
+        raise Warning("Wrong Cluster Backend Name!")
+    points=np.asarray(points,dtype=np.float64).reshape(-1,2)
+    labels=np.asarray(CLUSTERERS[backend](points,max_memory,**kwargs),dtype=np.int64) if len(points) else np.empty(0,dtype=np.int64)
+    centers,sizes=cluster_statistics(points,labels)
+    return {'points':points,'labels':labels,'centers':centers,'sizes':sizes,'count':len(sizes)}
+
+def cluster_statistics(points,labels):                                          #各类的中心和点数，用bincount一次算出
+    member=labels>=0
+    count=labels[member].max()+1 if member.any() else 0
+    sizes=np.bincount(labels[member],minlength=count)
+    with np.errstate(invalid='ignore'):
+        centers=np.stack([np.bincount(labels[member],points[member,axis],minlength=count) for axis in (0,1)],axis=1)/sizes[:,None]
+    keep=sizes>0                                                                #去掉空类并重新编号
+    if not keep.all():
+        new=np.cumsum(keep)-1
+        labels[member]=new[labels[member]]
+    return centers[keep],sizes[keep]
+
+def grid_aggregate(points,max_points):
+    """把点阵按正方形网格合并，使非空网格数不超过max_points；返回(各网格的重心,各网格的点数,每个点所属的网格号)。"""
+    lo=points.min(axis=0)
+    extent=np.maximum(points.max(axis=0)-lo,1e-12)
+    cell=np.sqrt(extent[0]*extent[1]/max_points)                               #先按点充满画布估计网格边长
+    while True:
+        shape=np.floor(extent/cell).astype(np.int64)+1
+        key=np.floor((points-lo)/cell).astype(np.int64)
+        _,cell_id,sizes=np.unique(key[:,0]*shape[1]+key[:,1],return_inverse=True,return_counts=True)
+        if len(sizes)<=max_points:
+            break
+        cell=cell*np.sqrt(len(sizes)/max_points)*1.05
+    centers=np.stack([np.bincount(cell_id,points[:,axis]) for axis in (0,1)],axis=1)/sizes[:,None]
+    return centers,sizes,cell_id
+
+#各聚类后端-------------------------------------------------------------------------
+@register_clusterer('affinity','AffinityPropagation')
+def _affinity(points,max_memory,random_state=5,**kwargs):
+    """近邻传播需要三个N×N矩阵；点数超过内存上限允许的数目时，在网格合并后的重心上聚类。"""
+    from sklearn.cluster import AffinityPropagation
+    max_points=max(int(np.sqrt(max_memory/(3*8))),2)
+    if len(points)<=max_points:
+        return AffinityPropagation(random_state=random_state,**kwargs).fit(points).labels_
+    centers,_,cell_id=grid_aggregate(points,max_points)
+    return AffinityPropagation(random_state=random_state,**kwargs).fit(centers).labels_[cell_id]
+
+@register_clusterer('kmeans','MiniBatchKMeans')
+def _kmeans(points,max_memory,n_clusters=8,random_state=5,**kwargs):
+    """内存与点数成线性；每批的点数按内存上限确定。"""
+    from sklearn.cluster import MiniBatchKMeans
+    n_clusters=min(n_clusters,len(points))
+    batch_size=int(min(max(max_memory//(8*(n_clusters+2)),256),len(points)))
+    return MiniBatchKMeans(n_clusters=n_clusters,batch_size=batch_size,random_state=random_state,n_init=3,**kwargs).fit_predict(points)
+
+@register_clusterer('dbscan','DBSCAN')
+def _dbscan(points,max_memory,eps=1.0,min_samples=5,**kwargs):
+    """用KD树查询eps邻域，内存与邻域内的点对数成正比；点数超过上限时在网格合并后的重心上聚类，
+    重心以所含点数为权重，min_samples仍按原始点数计。"""
+    from sklearn.cluster import DBSCAN
+    max_points=max(int(max_memory/(8*64)),2)                                    #按每点平均约64个邻居估计
+    if len(points)<=max_points:
+        return DBSCAN(eps=eps,min_samples=min_samples,algorithm='kd_tree',**kwargs).fit_predict(points)
+    centers,sizes,cell_id=grid_aggregate(points,max_points)
+    return DBSCAN(eps=eps,min_samples=min_samples,algorithm='kd_tree',**kwargs).fit_predict(centers,sample_weight=sizes)[cell_id]
+
+@register_clusterer('hdbscan','HDBSCAN')
+def _hdbscan(points,max_memory,min_cluster_size=20,**kwargs):                   #需要scikit-learn>=1.3
+    from sklearn.cluster import HDBSCAN
+    max_points=max(int(max_memory/(8*64)),2)
+    if len(points)<=max_points:
+        return HDBSCAN(min_cluster_size=min_cluster_size,algorithm='kd_tree',**kwargs).fit_predict(points)
+    centers,_,cell_id=grid_aggregate(points,max_points)
+    return HDBSCAN(min_cluster_size=min_cluster_size,algorithm='kd_tree',**kwargs).fit_predict(centers)[cell_id]
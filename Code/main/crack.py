@@ -1,13 +1,149 @@
 import numpy as np
+from itertools import count
+
+_VERSIONS = count()                                                              #全局递增的版本号，不同的表、每次修改都不同
+
+def crack_batch(x,y,theta,length):                                              #批量计算端点，返回(8,n)的列块
+    x,y,theta,length = np.broadcast_arrays(*(np.asarray(v,dtype=np.float64).reshape(-1) for v in (x,y,theta,length)))
+    half_cos = length/2*np.cos(theta)
+    half_sin = length/2*np.sin(theta)
+    return np.stack((x,y,theta,length,
+                     x + half_cos, y + half_sin,                                #p1
+                     x - half_cos, y - half_sin))                               #p2
+
 class Crack():
+    """一条裂隙，是(8,n)列块中某一列的轻量视图，不单独保存数据。"""
+    __slots__ = ('_data','_row')
     def __init__(self,x,y,theta,length):
-        self.x = x                                                              #中心点横坐标
-        self.y = y                                                              #中心点纵坐标
-        self.theta = theta                                                      #角度
-        self.length = length                                                    #长度
-        self.p1, self.p2 = self._get_points()                       
-    def _get_points(self):                                                      #通过中心点和长度确定端点坐标
-        p1 = (self.x + self.length/2*np.cos(self.theta), self.y + self.length/2*np.sin(self.theta))
-        p2 = (self.x - self.length/2*np.cos(self.theta), self.y - self.length/2*np.sin(self.theta))
-        return p1,p2
+        self._data = crack_batch(x,y,theta,length)
+        self._row = 0
+
+    @classmethod
+    def view(cls,data,row):                                                     #直接引用已有列块中的第row条裂隙
+        c = cls.__new__(cls)
+        c._data = data
+        c._row = row
+        return c
+
+    @property
+    def x(self):                                                                #中心点横坐标
+        return self._data[0,self._row]
+
+    @property
+    def y(self):                                                                #中心点纵坐标
+        return self._data[1,self._row]
+
+    @property
+    def theta(self):                                                            #角度
+        return self._data[2,self._row]
+
+    @property
+    def length(self):                                                           #长度
+        return self._data[3,self._row]
+
+    @property
+    def p1(self):
+        return (self._data[4,self._row],self._data[5,self._row])
+
+    @property
+    def p2(self):
+        return (self._data[6,self._row],self._data[7,self._row])
+
+
+class CrackTable():
+    """列式（structure-of-arrays）裂隙表。
+
+    所有裂隙存放在一个 (8, capacity) 的 float64 数组中，每一行是一列连续的数据：
+    x, y, theta, length, p1x, p1y, p2x, p2y；另有 int 类型的组号列 set_id。
+    同一组的裂隙在表中连续存放，因此按组取出的数据都是零拷贝的视图。
+    扩容时会重新分配内存，之前取出的视图不再随表更新。
+    version在每次追加、扩容后改变，用于判断按表缓存的结果是否过期；直接改写列数据后应调用modified()。
+    """
+    FIELDS = ('x','y','theta','length','p1x','p1y','p2x','p2y')
+
+    def __init__(self,capacity=256):
+        self._data = np.empty((len(self.FIELDS),capacity),dtype=np.float64)
+        self._set_id = np.empty(capacity,dtype=np.int64)
+        self._n = 0
+        self._offsets = [0]                                                     #每组在表中的起始行
+        self.version = next(_VERSIONS)
+
+    def __len__(self):
+        return self._n
+
+    @classmethod
+    def from_columns(cls,data,set_id,offsets):                                  #直接引用已有的列（可为只读的内存映射），不复制
+        table = cls.__new__(cls)
+        table._data,table._set_id = data,set_id
+        table._n = data.shape[1]
+        table._offsets = [int(k) for k in offsets]
+        table.version = next(_VERSIONS)
+        return table
+
+    def modified(self):                                                         #表中数据被直接改写后调用，使缓存失效
+        self.version = next(_VERSIONS)
+
+    def _reserve(self,n):                                                       #容量不足（或数据只读）时按倍数扩容
+        capacity = self._data.shape[1]
+        if n <= capacity and self._data.flags.writeable and self._set_id.flags.writeable:
+            return
+        capacity = max(n,2*capacity)
+        data = np.empty((len(self.FIELDS),capacity),dtype=np.float64)
+        data[:,:self._n] = self._data[:,:self._n]
+        set_id = np.empty(capacity,dtype=np.int64)
+        set_id[:self._n] = self._set_id[:self._n]
+        self._data,self._set_id = data,set_id
+        self.version = next(_VERSIONS)
+
+    def append_set(self,x,y,theta,length):                                      #整组追加，端点由crack_batch一次算出
+        batch = crack_batch(x,y,theta,length)
+        start,end = self._n,self._n+batch.shape[1]
+        self._reserve(end)
+        self._data[:,start:end] = batch
+        self._set_id[start:end] = len(self._offsets)-1
+        self._n = end
+        self._offsets.append(end)
+        self.version = next(_VERSIONS)
+
+    #整张表的列视图-------------------------------------------------------
+    @property
+    def x(self):
+        return self._data[0,:self._n]
+
+    @property
+    def y(self):
+        return self._data[1,:self._n]
+
+    @property
+    def theta(self):
+        return self._data[2,:self._n]
+
+    @property
+    def length(self):
+        return self._data[3,:self._n]
+
+    @property
+    def centers(self):                                                          #(n,2)
+        return self._data[0:2,:self._n].T
+
+    @property
+    def endpoints(self):                                                        #(n,2,2)，[i][0]为p1，[i][1]为p2
+        return self._data[4:8,:self._n].T.reshape(self._n,2,2)
+
+    @property
+    def set_id(self):
+        return self._set_id[:self._n]
+
+    #按组取视图-----------------------------------------------------------
+    @property
+    def group_num(self):
+        return len(self._offsets)-1
+
+    def group_slice(self,k):
+        return slice(self._offsets[k],self._offsets[k+1])
+
+    def group_slices(self):
+        return [self.group_slice(k) for k in range(self.group_num)]
 
+    def crack(self,i):                                                          #第i条裂隙的Crack视图
+        return Crack.view(self._data,i)
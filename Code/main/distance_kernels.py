@@ -0,0 +1,123 @@
+import numpy as np
+
+from profiling import timed,count
+
+#一维Wasserstein距离（W1）的向量化实现，输入为已排序的样本。
+#一对多的比较把u与每个v的归并结果拼成一个数组一次算完；样本已排序，归并位置由searchsorted得到，不需要再排序：
+#   W1 = ∫|F_u(x)-F_v(x)|dx，F为经验分布函数；
+#   周期（圆周/轴向）数据上 W1 = min_c ∫|F_u(x)-F_v(x)-c|dx，c取F_u-F_v按区间长度加权的中位数。
+
+def normalize_angle(theta,period=np.pi):                                        #把角度化到[0,period)，可用于数组
+    return np.mod(theta,period)
+
+def axial_degrees(theta):                                                       #弧度制的倾角化为[0,180)的角度
+    return np.rad2deg(normalize_angle(np.asarray(theta,dtype=np.float64)))
+
+def _merge(u,vs):
+    """u与vs中每个样本分别归并，拼成一个数组；返回(数值,配对号,F_u-F_v,各配对的起始位置,配对数)。
+
+    相等的值v排在u之前；相等值之间的区间长度为0，不影响结果。
+    """
+    u=np.asarray(u,dtype=np.float64)
+    n,k=len(u),len(vs)
+    sizes=np.array([len(v) for v in vs],dtype=np.int64)
+    V=np.concatenate([np.asarray(v,dtype=np.float64) for v in vs])
+    v_group=np.repeat(np.arange(k),sizes)
+    v_index=np.arange(len(V))-np.repeat(np.cumsum(sizes)-sizes,sizes)           #在各自样本中的序号
+    start=np.arange(k)*n+np.cumsum(sizes)-sizes                                 #每个配对在归并数组中的起始位置
+    rank=np.searchsorted(u,V,side='left')                                       #u中小于v的个数
+    #u_i之前的v_k个数：按(配对,rank)计数后累加
+    before=np.cumsum(np.bincount(v_group*(n+1)+rank,minlength=k*(n+1)).reshape(k,n+1),axis=1)[:,:n]
+    values=np.empty(k*n+len(V))
+    step=np.empty(len(values))
+    u_pos=(start[:,None]+np.arange(n)[None,:]+before).ravel()
+    v_pos=start[v_group]+v_index+rank
+    values[u_pos]=np.tile(u,k)
+    step[u_pos]=1/max(n,1)
+    values[v_pos]=V
+    step[v_pos]=-1/np.maximum(sizes,1)[v_group]
+    group=np.repeat(np.arange(k),n+sizes)
+    cdf=np.cumsum(step)                                                         #按配对分段累加
+    cdf=cdf-np.concatenate(([0.0],cdf))[start][group]
+    return values,group,cdf,start,k
+
+def _quantile_pieces(n,m):
+    """两个大小为n、m的经验分布的分位数函数在[0,1]上的公共分段：返回每段对应的u、v下标和段长。"""
+    R=np.union1d(np.arange(1,n+1)*m,np.arange(1,m+1)*n)                       #分段右端点，以1/(n*m)为单位
+    width=np.diff(R,prepend=0)/(n*m)
+    return (R+m-1)//m-1,(R+n-1)//n-1,width
+
+@timed('distance.wasserstein_one_to_many')
+def wasserstein_one_to_many(u,vs,period=None):
+    """u与vs中每个样本之间的W1距离，返回长度为len(vs)的数组；空样本的距离记为nan。
+
+    u和vs中的样本都须已从小到大排序，长度可以不同。
+    period不为None时按周期数据计算（轴向倾角取180，圆周方向取360），样本须已化到[0,period)。
+    """
+    vs=list(vs)
+    if not vs:
+        return np.empty(0)
+    empty=np.array([len(v)==0 for v in vs]) | (len(u)==0)
+    if empty.any():                                                             #空样本不参加归并，距离直接记为nan
+        distance=np.full(len(vs),np.nan)
+        if not empty.all():
+            distance[~empty]=wasserstein_one_to_many(u,[v for v,e in zip(vs,empty) if not e],period)
+        return distance
+    count('distance.wasserstein_pairs',len(vs))
+    sizes={len(v) for v in vs}
+    if period is None and len(sizes)==1:        #各样本大小相同时分位数的分段也相同，直接按矩阵计算
+        iu,iv,width=_quantile_pieces(len(u),sizes.pop())
+        V=np.asarray(vs,dtype=np.float64)
+        return np.abs(V[:,iv]-np.asarray(u,dtype=np.float64)[iu]).dot(width)
+    values,group,cdf,start,k=_merge(u,vs)
+    same=group[1:]==group[:-1]
+    width=np.diff(values)
+    if period is None:
+        distance=np.bincount(group[:-1][same],np.abs(cdf[:-1][same])*width[same],minlength=k).astype(np.float64)
+    else:
+        #各配对首尾之间绕回的一段上F_u-F_v=0
+        end=np.append(start[1:],len(values))-1
+        wrap_width=period-values[end]+values[start]
+        D=np.concatenate((cdf[:-1][same],np.zeros(k)))
+        W=np.concatenate((width[same],wrap_width))
+        G=np.concatenate((group[:-1][same],np.arange(k)))
+        c=_weighted_median(D,W,G,k)
+        distance=np.bincount(G,np.abs(D-c[G])*W,minlength=k).astype(np.float64)
+    return distance
+
+def _weighted_median(values,weights,group,k):                                   #每组的加权中位数，values在[-1,1]内
+    order=np.argsort(values+4*group,kind='stable')                             #按(组,数值)排序
+    values,weights,group=values[order],weights[order],group[order]
+    cum=np.cumsum(weights)
+    start=np.searchsorted(group,np.arange(k))
+    before=np.concatenate(([0.0],cum))[start]
+    total=np.bincount(group,weights,minlength=k)
+    half=before+total/2
+    index=np.searchsorted(cum,half,side='left')                                 #每组累积权重首次达到一半的位置
+    return values[np.minimum(index,len(values)-1)]
+
+def wasserstein(u,v,period=None):                                               #两个未排序样本之间的W1
+    return float(wasserstein_one_to_many(np.sort(u),[np.sort(v)],period)[0])
+
+def axial_wasserstein(u,v):                                                     #角度制轴向数据之间的W1
+    return wasserstein(normalize_angle(u,180),normalize_angle(v,180),180)
+
+#每张图的排序样本缓存--------------------------------------------------------------
+@timed('distance.sorted_samples')
+def sorted_samples(draw_obj):
+    """一张图的倾角（角度制，[0,180)）和长度的排序样本，整体及按组各一份。
+
+    结果缓存在draw_obj上，按裂隙表的version判断：表被追加、替换或调用modified()后重新计算。
+    """
+    cracks=draw_obj.cracks
+    key=cracks.version
+    cache=getattr(draw_obj,'_sorted_samples',None)
+    if cache is not None and cache[0]==key:
+        return cache[1]
+    directions=axial_degrees(cracks.theta)
+    samples={'directions':np.sort(directions),
+             'lengths':np.sort(cracks.length),
+             'set_directions':[np.sort(directions[s]) for s in cracks.group_slices()],
+             'set_lengths':[np.sort(cracks.length[s]) for s in cracks.group_slices()]}
+    draw_obj._sorted_samples=(key,samples)
+    return samples
@@ -1,35 +1,92 @@
 import numpy as np
-#方向概率统计分布----------------------------------------------
-def dir_distribution(mu,dispersion,number,dis_name):      
-    if dis_name=="Fisher":#kappa;2D Form of Vonmises-Fisher Distribution
-        return np.random.vonmises(mu,dispersion,number)
-    elif dis_name=="Normal":
-        return np.random.normal(mu,dispersion,number)
-    elif dis_name=="Uniform":
-        return mu
-    elif dis_name=="Lognormal":#对数正态lognormal
-        return np.random.lognormal(mu,dispersion,number)
-    else:
+#抽样函数注册表：SAMPLERS[类别][分布名]=sampler(mu,dispersion,number,rng,**kwargs)，
+#每个sampler用给定的rng一次性抽取恰好number个样本，返回一维数组
+SAMPLERS={'direction':{},'length':{},'spacing':{}}
+
+def register_sampler(kind,*names):                                             #注册新的分布，可用作装饰器
+    def decorator(func):
+        for name in names:
+            SAMPLERS[kind][name]=func
+        return func
+    return decorator
+
+def sample(kind,dis_name,mu,dispersion,number,rng=None,**kwargs):
+    if dis_name not in SAMPLERS[kind]:
         raise Warning("Wrong Distribution Name!")
+    rng=np.random.default_rng() if rng is None else rng
+    return np.asarray(SAMPLERS[kind][dis_name](mu,dispersion,int(number),rng,**kwargs),dtype=np.float64).reshape(-1)
+
+def _lognormal_params(mean,std):                                                #由样本均值、标准差换算对数正态的参数
+    sigma2=np.log(1+(std/mean)**2)
+    return np.log(mean)-sigma2/2,np.sqrt(sigma2)
+
+#方向概率统计分布----------------------------------------------
+@register_sampler('direction','Fisher')                                        #kappa;2D Form of Vonmises-Fisher Distribution
+def _direction_fisher(mu,dispersion,number,rng):
+    return rng.vonmises(mu,dispersion,number)
+
+@register_sampler('direction','Normal')
+def _direction_normal(mu,dispersion,number,rng):
+    return rng.normal(mu,dispersion,number)
+
+@register_sampler('direction','Uniform')                                       #所有裂隙取同一方向
+def _direction_uniform(mu,dispersion,number,rng):
+    return np.full(number,mu,dtype=np.float64)
+
+@register_sampler('direction','Lognormal')                                     #对数正态lognormal
+def _direction_lognormal(mu,dispersion,number,rng):
+    return rng.lognormal(mu,dispersion,number)
 
 #长度概率统计分布----------------------------------------------
-def len_distribution(mu,dispersion,number,dis_name):      
-    if dis_name=="Exponential":
-        return np.random.exponential(mu,dispersion,number)
-    elif dis_name=="Gamma":
-        return np.random.gamma(mu/dispersion,dispersion,number)
-    elif dis_name=="Normal":
-        return np.random.normal(mu,dispersion,number)
-    elif dis_name=="Uniform":
-        return mu
-    else:
-        raise Warning("Wrong Distribution Name!")
+@register_sampler('length','Exponential')                                      #mu为均值
+def _length_exponential(mu,dispersion,number,rng):
+    return rng.exponential(mu,number)
+
+@register_sampler('length','Gamma')
+def _length_gamma(mu,dispersion,number,rng):
+    return rng.gamma(mu/dispersion,dispersion,number)
+
+@register_sampler('length','Normal')
+def _length_normal(mu,dispersion,number,rng):
+    return rng.normal(mu,dispersion,number)
+
+@register_sampler('length','Uniform')
+def _length_uniform(mu,dispersion,number,rng):
+    return np.full(number,mu,dtype=np.float64)
+
+@register_sampler('length','Lognormal')                                        #mu、dispersion为长度本身的均值和标准差
+def _length_lognormal(mu,dispersion,number,rng):
+    return rng.lognormal(*_lognormal_params(mu,dispersion),number)
+
+@register_sampler('length','Pareto','PowerLaw')                                #幂律：mu为最小长度，dispersion为指数alpha，upper为截断上限
+def _length_pareto(mu,dispersion,number,rng,upper=np.inf):
+    u=rng.uniform(size=number)
+    tail=(mu/upper)**dispersion                                                 #截断处的生存函数值，upper为inf时为0
+    return mu*(1-u*(1-tail))**(-1/dispersion)
 
 #间距概率统计分布-----------------------------------------------
-def spacing_distribution(mu,dispersion,number,dis_name):
-    if dis_name=="Uniform":
-        return np.random.uniform(0.9*mu,1.10*mu,number)
-    elif dis_name=="Normal":
-        return np.random.normal(mu,dispersion,number)
-    else:
-        raise Warning("Wrong Distribution Name!")
\ No newline at end of file
+@register_sampler('spacing','Uniform')
+def _spacing_uniform(mu,dispersion,number,rng):
+    return rng.uniform(0.9*mu,1.10*mu,number)
+
+@register_sampler('spacing','Normal')
+def _spacing_normal(mu,dispersion,number,rng):
+    return rng.normal(mu,dispersion,number)
+
+@register_sampler('spacing','Exponential')                                     #裂隙位置服从泊松过程
+def _spacing_exponential(mu,dispersion,number,rng):
+    return rng.exponential(mu,number)
+
+@register_sampler('spacing','Lognormal')
+def _spacing_lognormal(mu,dispersion,number,rng):
+    return rng.lognormal(*_lognormal_params(mu,dispersion),number)
+
+#兼容原来的接口-------------------------------------------------
+def dir_distribution(mu,dispersion,number,dis_name,rng=None):
+    return sample('direction',dis_name,mu,dispersion,number,rng)
+
+def len_distribution(mu,dispersion,number,dis_name,rng=None):
+    return sample('length',dis_name,mu,dispersion,number,rng)
+
+def spacing_distribution(mu,dispersion,number,dis_name,rng=None):
+    return sample('spacing',dis_name,mu,dispersion,number,rng)
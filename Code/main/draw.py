@@ -1,209 +1,195 @@
 import numpy as np
-import matplotlib.pyplot as plt
-import matplotlib as mpl
-from crack import Crack
+from crack import CrackTable
 from tool import theta_standardlize,deg2rad,length_check
-from distribution import dir_distribution, len_distribution, spacing_distribution
-rrs=np.random.RandomState(5)
+from distribution import sample
+from profiling import timed,stage,count
+class _SampleStream():
+    """按需分批抽样的一维序列，长度不够时按倍数追加一批。"""
+    def __init__(self,draw,size):
+        self._draw=draw
+        self.values=draw(max(size,2))
+
+    def ensure(self,n):
+        if n>len(self.values):
+            self.values=np.concatenate((self.values,self._draw(max(n,2*len(self.values))-len(self.values))))
+        return self.values
+
 class Draw():
-    def __init__(self,canvas_size = (100,100)):                                 #默认画布大小为100×100
+    def __init__(self,canvas_size = (100,100),seed = None):                     #默认画布大小为100×100
         self.x_max,self.y_max = canvas_size
-        self.crack_inform_pairs = []
+        self.rng = np.random.default_rng(seed)                                  #每张图独立的随机数流，seed可为整数、SeedSequence或Generator
+        self.cracks = CrackTable()                                              #所有裂隙的列式存储
         #美化一下颜色
         red='#CD0000';green='#2E8B57';blue='#3A5FCD';orange='#EE9A00';purple='#9B30FF'
         self.colors = [red,'darkcyan','dodgerblue','DarkOrange',purple]           #每组用不同颜色表示，暂定最多为5组
-        #用于输出裂隙的信息
-        self.direction_collection=[]
-        self.length_collection=[]
-        self.centerpoint_collection=[]
-        self.endpoint_collection=[]
+        #每组的间距（按组记录，不按裂隙）
         self.spacing_collection=[]
+        #每组生成时的参数，随图一起保存
+        self.configs=[]
     
         
-    #用于输出裂隙的信息的函数----------------------------------------------
+    #用于输出裂隙的信息的函数，按组返回裂隙表的零拷贝视图----------------------
     def get_directions(self): 
-        return self.direction_collection
+        return [self.cracks.theta[s] for s in self.cracks.group_slices()]
     
     def get_length(self):
-        return self.length_collection
+        return [self.cracks.length[s] for s in self.cracks.group_slices()]
     
     def get_centerpoints(self):
-        return self.centerpoint_collection
+        return [self.cracks.centers[s] for s in self.cracks.group_slices()]
     
     def get_endpoints(self):
-        return self.endpoint_collection
+        return [self.cracks.endpoints[s] for s in self.cracks.group_slices()]
     
     def get_spacing(self):
         return self.spacing_collection
+
+    @property
+    def group_num(self):
+        return self.cracks.group_num
     #----------------------------------------------------------------------     
                    
-    def _add(self,crack,color):
-        self.crack_inform_pairs.append([crack,color])
-    
     def _adjust_into_canvas(self,crack,colors):
         return crack
     
-    def _generate_location(self,theta,spacing,spacing_dis,length,length_dis):                         #确定中心点的坐标
-        x_list,y_list=[],[]
-        #将化到区间[0，pi）中
-        theta=theta_standardlize(theta)
-        index_max=len(length_dis)-1
-        #print(index_max)
-        #根据倾角分为三种情况
-        if  0 <= theta and theta< np.pi/2:
-            n = int((self.y_max + self.x_max*np.tan(theta))/(spacing/np.cos(theta)))
-            b_list = [-self.x_max*np.tan(theta)+(i*(spacing_dis[i]/np.cos(theta))) for i in range(n)]
+    def _scanline_count(self,theta,spacing):                                    #按名义间距需要的假定线条数
+        if 0 <= theta and theta < np.pi/2:
+            return max(int((self.y_max + self.x_max*np.tan(theta))/(spacing/np.cos(theta))),0)
         elif (np.pi/2) < theta:
-            n = int((self.y_max - self.x_max*np.tan(theta))/(-spacing/np.cos(theta)))
-            b_list = [((i+1)*(-spacing_dis[i]/np.cos(theta))) for i in range(n)]
-        elif theta==np.pi/2:                                                   #平行于y轴，情况特殊
-            n = int(self.x_max/spacing)
-            x_list=[ ((i+1)*spacing_dis[i]) for i in range(n)]
-            y_list=[ rrs.uniform(0,self.y_max) for i in range(n)]
-            b_list=[]                                               
-        print(len(b_list))
-        index = 0
-        for b in b_list:
-            if index>=500:
-                break
-            len_interval=(length_dis[index]+length_dis[index+1])*0.5
-            len_distance=length_dis[index]*0.5+length_dis[index+1]
+            return max(int((self.y_max - self.x_max*np.tan(theta))/(-spacing/np.cos(theta))),0)
+        return max(int(self.x_max/spacing),0)
+
+    def _scanlines(self,theta,spacing_dis):                                     #各条假定线的截距b
+        n=len(spacing_dis)
+        if 0 <= theta and theta < np.pi/2:
+            return -self.x_max*np.tan(theta)+np.arange(n)*(spacing_dis/np.cos(theta))
+        return (np.arange(n)+1)*(-spacing_dis/np.cos(theta))
+
+    def _line_steps(self,x_first,x_max,cos,index,length,length_dis):
+        """一条假定线上第一条裂隙之后的各条裂隙的x坐标。
 
-            x,y,again_gen,x_next_min,x_next_max,x_max=self._first_generate_xy(b,theta,length,len_interval,len_distance)
-            x_list.append(x);y_list.append(y);index=index+1
-            
-            while again_gen==True and index<(index_max-2) and x_next_max<x_max:                                               #判断是否需要在假定线上画多条裂隙
-                len_interval=(length_dis[index]+length_dis[index+1])*0.4
-                len_distance=(length_dis[index]*0.5+length_dis[index+1])*1.0
-                x,y,again_gen,x_next_min,x_next_max=self._again_generate_xy(b,theta,x_next_min,x_next_max,x_max,length,len_interval,len_distance)
-                x_list.append(x);y_list.append(y);index=index+1
-        # print(index)       
+        x_k=x_(k-1)+|cos|*U(len_interval,len_distance)，用累加一次算出；
+        只要下一条的x_next_max小于x_max就继续。
+        """
+        n_steps=max(int((x_max-x_first)/(cos*0.8*length)),0)+2                         #按名义长度估计的条数，不够再加倍
+        while True:
+            L=length_dis.ensure(index+n_steps+1)
+            L0,L1=L[index:index+n_steps],L[index+1:index+n_steps+1]
+            interval=(L0+L1)*0.4
+            interval[:1]=(L0[0]+L1[0])*0.5
+            step_max=cos*(L0*0.5+L1)
+            step=cos*interval+self.rng.uniform(size=n_steps)*(step_max-cos*interval)
+            x=x_first+np.cumsum(step)
+            x_prev=np.concatenate(([x_first],x[:-1]))
+            fits=(x_prev+step_max)<x_max
+            if not fits.all():
+                return x[:int(np.argmin(fits))]
+            n_steps=n_steps*2
+
+    def _generate_location(self,theta,spacing_dis,length,length_dis):          #确定中心点的坐标，length_dis为_SampleStream
+        #将化到区间[0，pi）中
+        theta=theta_standardlize(theta)
+        if theta==np.pi/2:                                                      #平行于y轴，情况特殊
+            n = len(spacing_dis)
+            return (np.arange(n)+1)*spacing_dis,self.rng.uniform(0,self.y_max,n)
+        b=self._scanlines(theta,spacing_dis)
+        tan,cos=np.tan(theta),abs(np.cos(theta))
+        #每条假定线在画布内的x范围，分截距在画布下方、画布内、画布上方三种情况
+        with np.errstate(divide='ignore',invalid='ignore'):
+            x_min=np.where(b<0,-b/tan,np.where(b>self.y_max,-(b-self.y_max)/tan,0.0))
+            inside_max=(self.y_max-b)/tan if theta<np.pi/2 else -b/tan
+        inside_max=np.where(np.isfinite(inside_max),inside_max,self.x_max)
+        x_max=np.where((b<0) | (b>self.y_max),self.x_max,inside_max)
+        finite=np.isfinite(x_min)                                               #水平线截距在画布外时与画布无交点
+        b,x_min,x_max=b[finite],x_min[finite],x_max[finite]
+        #每条线上的第一条裂隙
+        long_line=((x_max-x_min)/cos>length) & (x_max>x_min)                    #能否在同一条线上画多条裂隙
+        x_first=x_min+self.rng.uniform(size=len(b))*np.where(long_line,length,x_max-x_min)
+        x_list,b_list=[],[]
+        index=0
+        for k in range(len(b)):
+            x_line=[x_first[k]]
+            if long_line[k]:
+                x_line=np.concatenate((x_line,self._line_steps(x_first[k],x_max[k],cos,index,length,length_dis)))
+            x_list.append(x_line)
+            b_list.append(np.full(len(x_line),b[k]))
+            index=index+len(x_line)
+        if not x_list:
+            return np.empty(0),np.empty(0)
+        x_list=np.concatenate(x_list)
+        y_list=tan*x_list+np.concatenate(b_list)+self.rng.uniform(-0.05*length,0.05*length,len(x_list))
         return x_list,y_list
-        
-    def _again_generate_xy(self,b,theta,x_next_min,x_next_max,x_max,length,len_interval,len_distance):
-        again_gen=False
-        x = rrs.uniform(x_next_min,x_next_max)
-        y = np.tan(theta)*x+b+rrs.uniform(-0.05*length,0.05*length)
-        x_next_min,x_next_max=x+len_interval*abs(np.cos(theta)),x+len_distance*abs(np.cos(theta))
-        if (x_max>x_next_min):
-            again_gen=True
-        return x,y,again_gen,x_next_min,x_next_max
-    
-    def _first_generate_xy(self,b,theta,length,len_interval,len_distance):
-        again_gen=False
-        x_next_min,x_next_max,x_min,x_max=0,0,0,0
-        if b<0:                                                                 #截距在原点下方，计算x坐标的最小值
-            x_min,x_max =-b/np.tan(theta),self.x_max
-            if ((x_max-x_min)/abs(np.cos(theta)))>length and x_max>x_min:
-                again_gen=True
-                x = rrs.uniform(x_min,x_min+length)
-                y = np.tan(theta)*x+b+rrs.uniform(-0.05*length,0.05*length)
-                x_next_min,x_next_max=x+len_interval*abs(np.cos(theta)),x+len_distance*abs(np.cos(theta))
-            else:
-                x = rrs.uniform(x_min,x_max)
-                y = np.tan(theta)*x+b+rrs.uniform(-0.05*length,0.05*length)
-        elif 0<b and b<self.y_max:                                             #截距在画布内，计算x坐标的最大值，分两种情况
-            if  0 < theta and theta< np.pi/2:                  
-                x_min,x_max=0,(self.y_max-b)/np.tan(theta)
-                if ((x_max-x_min)/abs(np.cos(theta)))>length and x_max>x_min:
-                    again_gen=True
-                    x = rrs.rand()*length
-                    y = np.tan(theta)*x+b+rrs.uniform(-0.05*length,0.05*length)
-                    x_next_min,x_next_max=x+len_interval*abs(np.cos(theta)),x+len_distance*abs(np.cos(theta))
-                else:
-                    x = rrs.rand()*x_max
-                    y = np.tan(theta)*x+b+rrs.uniform(-0.05*length,0.05*length)
-            elif (np.pi/2) < theta and theta< np.pi:
-                x_min,x_max=0,-b/np.tan(theta)
-                if ((x_max-x_min)/abs(np.cos(theta)))>length and x_max>x_min:
-                    again_gen=True
-                    x = rrs.rand()*length
-                    y = np.tan(theta)*x+b+rrs.uniform(-0.05*length,0.05*length)
-                    x_next_min,x_next_max=x+len_interval*abs(np.cos(theta)),x+len_distance*abs(np.cos(theta))
-                else:
-                    x = rrs.rand()*x_max
-                    y = np.tan(theta)*x+b+rrs.uniform(-0.05*length,0.05*length)
-        elif b>self.y_max:                                                      #截距在画布上边界上方，计算x坐标的最小值
-            x_min,x_max = -(b-self.y_max)/np.tan(theta),self.x_max
-            if ((x_max-x_min)/abs(np.cos(theta)))>length and x_max>x_min:
-                again_gen=True
-                x = rrs.uniform(x_min,x_min+length)
-                y = np.tan(theta)*x+b+rrs.uniform(-0.05*length,0.05*length)
-                x_next_min,x_next_max=x+len_interval*abs(np.cos(theta)),x+len_distance*abs(np.cos(theta))
-            else:
-                x = rrs.uniform(x_min,x_max)
-                y = np.tan(theta)*x+b+rrs.uniform(-0.05*length,0.05*length)
-        return x,y,again_gen,x_next_min,x_next_max,x_max
-    
+
     def _is_in_canvas(self,x,y):
         return x >= 0 and x <= self.x_max and y >= 0 and y <= self.y_max
         
+    @timed('draw.generate_crack')
     def generate_crack(self,configs):
+        """configs中每组除name、spacing、theta、number、length外，还可用
+        theta_distribution/theta_dispersion、length_distribution/length_dispersion、
+        spacing_distribution/spacing_dispersion指定distribution.SAMPLERS中注册的分布，
+        theta_params、length_params、spacing_params为传给该分布的其他参数（字典），
+        如截断幂律的上限 'length_distribution':'PowerLaw','length_params':{'upper':50}。"""
         for idx1,config in enumerate(configs):
             name = config['name']
             number = config['number']
             spacing = config['spacing']
-            spacing_dis = spacing_distribution(config['spacing'] ,2,1000,"Uniform") 
-            theta=deg2rad(config['theta'])
-            theta_dis = dir_distribution(deg2rad(config['theta']),0.1,1000,"Fisher")  #倾角满足von-Mises-Fisher分布                   
+            theta=theta_standardlize(deg2rad(config['theta']))
             length=config['length']
-            length_dis=len_distribution(config['length'],2,1000,"Normal")             #长度满足给定分布
-            length_dis=length_check(length_dis)
+            #间距：每条假定线恰好一个样本
+            spacing_dis = sample('spacing',config.get('spacing_distribution',"Uniform"),spacing,
+                                 config.get('spacing_dispersion',2),self._scanline_count(theta,spacing),self.rng,
+                                 **config.get('spacing_params',{}))
+            #长度满足给定分布，按布置需要分批抽样
+            length_dis = _SampleStream(lambda n: length_check(sample('length',config.get('length_distribution',"Normal"),length,
+                                                                     config.get('length_dispersion',2),n,self.rng,
+                                                                     **config.get('length_params',{}))),
+                                       self._expected_count(theta,spacing,length,len(spacing_dis)))
 #            color = self.colors[idx1] 
-            x_l,y_l = self._generate_location(theta,spacing,spacing_dis,length,length_dis)       #调用随机生成中心点坐标的函数
+            with stage('draw.location'):
+                x_l,y_l = self._generate_location(theta,spacing_dis,length,length_dis)   #调用随机生成中心点坐标的函数
             if number>len(x_l): 
                 number=len(x_l)
                 print("要求的个数溢出，已生成可能的最多的裂隙个数。最多生成"+str(len(x_l))+"条迹线。")
-            idxs = rrs.choice(np.arange(len(x_l)),number,replace=False)        #从生成的坐标列表中选取指定数量
+            idxs = self.rng.choice(len(x_l),number,replace=False)        #从生成的坐标列表中选取指定数量
+            selected = np.zeros(len(x_l),dtype=bool)                            #按原顺序取出被选中的裂隙
+            selected[idxs] = True
+            sel = np.flatnonzero(selected)
+            #倾角满足von-Mises-Fisher分布，只为选中的裂隙抽样
+            theta_dis = sample('direction',config.get('theta_distribution',"Fisher"),deg2rad(config['theta']),
+                               config.get('theta_dispersion',0.1),number,self.rng,**config.get('theta_params',{}))
 
-            
-            i=0
-            new_theta_collection,new_length_collection,new_centerpoint_collection,new_endpoint_collection=[],[],[],[]
-            for idx2,(x,y) in enumerate(zip(x_l,y_l)):
-                if idx2 in idxs:
-                    color="black"
-                    c = Crack(x = x,
-                              y = y,
-                              theta = theta_dis[i],
-                              length = length_dis[i])
-                    self._add(c,color)
-                    #为输出做准备
-                    new_theta_collection.append(float(c.theta))
-                    new_length_collection.append(float(c.length))
-                    new_centerpoint_collection.append([c.x,c.y])
-                    new_endpoint_collection.append([[c.p1[0],c.p1[1]],[c.p2[0],c.p2[1]]])                   
-                    
-                    #------------------------
-                    # self.direction_collection.append(float(c.theta))
-                    # self.length_collection.append(float(c.length))
-                    # self.centerpoint_collection.append([c.x,c.y])
-                    # self.endpoint_collection.append([[c.p1[0],c.p1[1]],[c.p2[0],c.p2[1]]])
-                                     
-                    #--------------------------
-                                       
-                i=i+1
-                        
-            #为输出做准备
-            self.direction_collection.append(new_theta_collection)
-            self.length_collection.append(new_length_collection)
-            self.centerpoint_collection.append(new_centerpoint_collection)
-            self.endpoint_collection.append(new_endpoint_collection)
+            #一次取出坐标、角度和长度，整组写入裂隙表，端点批量计算
+            self.cracks.append_set(x_l[sel],y_l[sel],theta_dis,length_dis.values[sel])
+            count('draw.candidates',len(x_l))
+            count('draw.cracks',number)
             self.spacing_collection.append(spacing)
+            self.configs.append(dict(config))
+
+    def _expected_count(self,theta,spacing,length,n_lines):                     #估计一组的候选裂隙数，用于第一次抽样
+        cos=abs(np.cos(theta))
+        chord=min(self.x_max/cos if cos>0 else np.inf,self.y_max/np.sin(theta) if np.sin(theta)>0 else np.inf)
+        return int(n_lines*(chord/(1.15*length)+1))+2
     
     #画图
+    @timed('plot.draw')
     def plot(self): 
+        import matplotlib.pyplot as plt                                         #只在画图时才导入matplotlib
+        import matplotlib as mpl
         plt.title("Crack Map",fontsize=30)    
         plt.rcParams['figure.figsize'] = [5,5]
         mpl.rcParams['figure.dpi']=200                                                              #在画布上画出线段和中心点
-        for c,color in self.crack_inform_pairs:
-            plt.plot([c.p1[0],c.p2[0]],[c.p1[1],c.p2[1]],color=color,linewidth=1.0)
+        for p1,p2 in self.cracks.endpoints:
+            plt.plot([p1[0],p2[0]],[p1[1],p2[1]],color="black",linewidth=1.0)
             #plt.scatter(c.x,c.y, facecolors='none', edgecolors='b')
         plt.xlim(0,self.x_max)
         plt.ylim(0,self.y_max)
         plt.show()
         
+    @timed('plot.draw_heatmap')
     def heatmap_plot(self):                                                                   #在画布上画出线段和中心点
-        for c,color in self.crack_inform_pairs:
-            plt.plot([c.p1[0],c.p2[0]],[c.p1[1],c.p2[1]],color = 'navy',linewidth=1)
+        import matplotlib.pyplot as plt
+        for p1,p2 in self.cracks.endpoints:
+            plt.plot([p1[0],p2[0]],[p1[1],p2[1]],color = 'navy',linewidth=1)
         plt.xlim(0,self.x_max)
         plt.ylim(0,self.y_max)
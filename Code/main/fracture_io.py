@@ -0,0 +1,101 @@
+import numpy as np
+import csv
+import json
+import os
+
+from crack import CrackTable
+from draw import Draw
+from tool import axial_mean
+
+#裂隙图的保存格式：一个目录，内含
+#   header.json  画布大小、每组的起始行offsets、间距和生成参数configs
+#   data.npy     (8,n)的float64列块，行依次为CrackTable.FIELDS
+#   set_id.npy   (n,)的int64组号
+FORMAT_VERSION=1
+CSV_COLUMNS=('x1','y1','x2','y2','set')
+
+def _json_default(value):                                                       #configs中的numpy数值转为python数值
+    if isinstance(value,np.generic):
+        return value.item()
+    if isinstance(value,np.ndarray):
+        return value.tolist()
+    raise TypeError("Object of type "+type(value).__name__+" is not JSON serializable")
+
+def save_map(draw_obj,path):
+    """把裂隙图保存到目录path（不存在时新建），裂隙数据按列存为.npy。"""
+    os.makedirs(path,exist_ok=True)
+    cracks=draw_obj.cracks
+    n=len(cracks)
+    np.save(os.path.join(path,'data.npy'),np.ascontiguousarray(cracks._data[:,:n]))
+    np.save(os.path.join(path,'set_id.npy'),np.ascontiguousarray(cracks.set_id))
+    header={'format':FORMAT_VERSION,
+            'canvas_size':[draw_obj.x_max,draw_obj.y_max],
+            'offsets':list(cracks._offsets),
+            'spacing':list(draw_obj.get_spacing()),
+            'configs':list(getattr(draw_obj,'configs',[]))}
+    with open(os.path.join(path,'header.json'),'w',encoding='utf-8') as f:
+        json.dump(header,f,ensure_ascii=False,indent=1,default=_json_default)
+
+def load_map(path,mmap_mode='r'):
+    """读取save_map保存的裂隙图。
+
+    默认以mmap_mode='r'内存映射打开，不读入整个文件，多个进程可共享同一份只读数据；
+    需要在多进程中使用时传递路径，在子进程中各自load_map。
+    只读映射的图仍可generate_crack追加新组，追加时裂隙表会复制到内存中。
+    """
+    with open(os.path.join(path,'header.json'),encoding='utf-8') as f:
+        header=json.load(f)
+    if header.get('format')!=FORMAT_VERSION:
+        raise ValueError("Unsupported fracture map format: "+str(header.get('format')))
+    data=np.load(os.path.join(path,'data.npy'),mmap_mode=mmap_mode)
+    set_id=np.load(os.path.join(path,'set_id.npy'),mmap_mode=mmap_mode)
+    draw_obj=Draw(tuple(header['canvas_size']))
+    draw_obj.cracks=CrackTable.from_columns(data,set_id,header['offsets'])
+    draw_obj.spacing_collection=list(header['spacing'])
+    draw_obj.configs=list(header['configs'])
+    return draw_obj
+
+#迹线表（CSV）--------------------------------------------------------------
+def export_csv(draw_obj,path):
+    """每条裂隙一行：两个端点坐标x1,y1,x2,y2和组号set。"""
+    cracks=draw_obj.cracks
+    table=np.column_stack((cracks.endpoints.reshape(-1,4),cracks.set_id))
+    np.savetxt(path,table,fmt=['%.10g']*4+['%d'],delimiter=',',header=','.join(CSV_COLUMNS),comments='')
+
+def import_csv(path,canvas_size=None):
+    """从迹线表（如野外测绘的迹线）建立裂隙图，可直接用于similarity_analysis。
+
+    表头需包含x1,y1,x2,y2，可选set列为组名（数字或文字），没有set列时全部视为一组。
+    canvas_size缺省时取所有端点坐标的最大值（向上取整）。
+    每组的间距没有直接的测量值，用 画布面积/该组迹线总长 估计（即1/P21）。
+    """
+    with open(path,newline='',encoding='utf-8-sig') as f:
+        rows=list(csv.DictReader(f))
+    if not rows:
+        raise ValueError("Empty trace table: "+str(path))
+    coords=np.array([[float(row[c]) for c in CSV_COLUMNS[:4]] for row in rows]).reshape(-1,2,2)
+    labels=[row.get('set','0') or '0' for row in rows]
+    names=list(dict.fromkeys(labels))                                           #按首次出现的顺序编组
+    group=np.array([names.index(label) for label in labels])
+    order=np.argsort(group,kind='stable')                                       #同组的裂隙在表中连续存放
+    coords,group=coords[order],group[order]
+
+    d=coords[:,0,:]-coords[:,1,:]
+    length=np.hypot(d[:,0],d[:,1])
+    theta=np.mod(np.arctan2(d[:,1],d[:,0]),np.pi)
+    center=coords.mean(axis=1)
+    if canvas_size is None:
+        canvas_size=(float(np.ceil(coords[...,0].max())),float(np.ceil(coords[...,1].max())))
+
+    draw_obj=Draw(canvas_size)
+    area=draw_obj.x_max*draw_obj.y_max
+    for k,name in enumerate(names):
+        rows_k=group==k
+        draw_obj.cracks.append_set(center[rows_k,0],center[rows_k,1],theta[rows_k],length[rows_k])
+        draw_obj.spacing_collection.append(float(area/length[rows_k].sum()))
+        draw_obj.configs.append({'name':name,
+                                 'spacing':draw_obj.spacing_collection[-1],
+                                 'theta':float(np.rad2deg(axial_mean(theta[rows_k]))),
+                                 'number':int(rows_k.sum()),
+                                 'length':float(length[rows_k].mean())})
+    return draw_obj
@@ -0,0 +1,263 @@
+import numpy as np
+import csv
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from scipy import ndimage
+
+from draw import Draw
+from tool import axial_mean
+
+#迹线图（Image samples/label中白色迹线、黑色背景的PNG）转成与Draw相同的线段表示。
+#流程：二值化 -> 骨架化 -> 在交叉点处断开成分支 -> 每个分支按网格切成小块 -> 每块用主成分拟合一条线段
+CACHE_VERSION=1
+EIGHT=np.ones((3,3),dtype=bool)                                                 #8邻域
+
+def read_image(path):                                                           #读成[0,1]的灰度图
+    from matplotlib.image import imread
+    image=imread(path)
+    image=image/255 if image.dtype.kind in 'ui' else np.asarray(image,dtype=np.float64)   #PNG读出为[0,1]的浮点，JPG为0~255的整数
+    if image.ndim==3:
+        image=image[...,:3].mean(axis=2)
+    return image
+
+def iter_batches(paths,batch_size=8):                                           #分批读图，内存中最多同时有batch_size张
+    paths=list(paths)
+    for k in range(0,len(paths),batch_size):
+        batch=paths[k:k+batch_size]
+        yield batch,[read_image(p) for p in batch]
+
+def skeleton(image,threshold=0.5):
+    """二值化后骨架化；装有scikit-image时用其skeletonize，否则用thin。"""
+    mask=np.asarray(image)>threshold
+    try:
+        from skimage.morphology import skeletonize
+    except ImportError:
+        return thin(mask)
+    return skeletonize(mask)
+
+def thin(mask):
+    """Zhang-Suen细化，把二值图中的迹线削成单像素宽；每轮两个子步骤对整张图同时判断。"""
+    skel=np.pad(np.asarray(mask,dtype=bool),1)
+    while True:
+        changed=False
+        for step in (0,1):
+            B,A,(P2,P4,P6,P8)=_neighbourhood(skel)
+            if step==0:
+                side=(P2*P4*P6==0) & (P4*P6*P8==0)
+            else:
+                side=(P2*P4*P8==0) & (P2*P6*P8==0)
+            delete=skel[1:-1,1:-1] & (B>=2) & (B<=6) & (A==1) & side
+            if delete.any():
+                skel[1:-1,1:-1]&=~delete
+                changed=True
+        if not changed:
+            break
+    #Zhang-Suen在斜线上留下阶梯状的拐角像素（有3个邻点，会被trace_segments当作交叉点）：
+    #两个相互垂直的4邻点都在、它们之间的对角点和对侧三个点都不在时，删去该点不影响连通性
+    for a in (0,2,4,6):
+        P=_neighbours(skel)
+        b=(a+2)%8
+        corner=P[a] & P[b] & ~P[a+1] & ~P[(b+2)%8] & ~P[(b+3)%8] & ~P[(b+4)%8]
+        skel[1:-1,1:-1]&=~corner
+    return skel[1:-1,1:-1]
+
+def _neighbours(skel):                                                          #(已在四周补零的)二值图中内部像素的8个邻点，从正上方开始顺时针
+    return [skel[:-2,1:-1],skel[:-2,2:],skel[1:-1,2:],skel[2:,2:],skel[2:,1:-1],skel[2:,:-2],skel[1:-1,:-2],skel[:-2,:-2]]
+
+def _neighbourhood(skel):
+    """每个内部像素的邻点个数B、顺时针0->1的次数A，以及上、右、下、左四个邻点。"""
+    P=[p.astype(np.uint8) for p in _neighbours(skel)]
+    B=sum(P)
+    A=sum((P[k]==0) & (P[(k+1)%8]==1) for k in range(8))
+    return B,A,(P[0],P[2],P[4],P[6])
+
+def trace_segments(image,piece=50,min_pixels=5,threshold=0.5):
+    """从迹线图中提取线段。
+
+    返回(segments,branch)：segments为(n,2,2)的像素坐标端点（x向右，y向上），
+    branch为每条线段所属的分支（交叉点之间的一段迹线）编号。
+    弯曲的迹线按边长piece像素的网格切开，每块单独拟合，因此线段长度不超过约piece*sqrt(2)。
+    """
+    skel=skeleton(image,threshold)
+    neighbours=ndimage.convolve(skel.astype(np.int64),EIGHT.astype(np.int64),mode='constant')-1
+    branches,_=ndimage.label(skel & (neighbours<=2),structure=EIGHT)             #去掉交叉点后按8连通编号
+    rows,cols=np.nonzero(branches)
+    label=branches[rows,cols]
+    x,y=cols+0.5,skel.shape[0]-rows-0.5                                         #像素中心，y轴向上
+    #按(分支,网格块)分组
+    cells_x=skel.shape[1]//piece+1
+    key=(label*(skel.shape[0]//piece+1)+rows//piece)*cells_x+cols//piece
+    _,group,count=np.unique(key,return_inverse=True,return_counts=True)
+    keep=count>=min_pixels
+    #每组的均值和协方差，用bincount一次算出
+    n=np.maximum(count,1)
+    mx,my=np.bincount(group,x)/n,np.bincount(group,y)/n
+    dx,dy=x-mx[group],y-my[group]
+    sxx,syy,sxy=np.bincount(group,dx*dx)/n,np.bincount(group,dy*dy)/n,np.bincount(group,dx*dy)/n
+    angle=0.5*np.arctan2(2*sxy,sxx-syy)                                         #主方向
+    c,s=np.cos(angle),np.sin(angle)
+    t=dx*c[group]+dy*s[group]                                                   #沿主方向的投影
+    t_min=np.full(len(count),np.inf)
+    t_max=np.full(len(count),-np.inf)
+    np.minimum.at(t_min,group,t)
+    np.maximum.at(t_max,group,t)
+    t_min,t_max=t_min-0.5,t_max+0.5                                             #补上首尾像素的半个边长
+    p1=np.column_stack((mx+t_max*c,my+t_max*s))
+    p2=np.column_stack((mx+t_min*c,my+t_min*s))
+    segment_branch=np.zeros(len(count),dtype=np.int64)
+    segment_branch[group]=label
+    return np.stack((p1,p2),axis=1)[keep],segment_branch[keep]
+
+def axial_groups(theta,k,weights=None,iterations=20):
+    """把[0,pi)内的方向按轴向k均值分成k组，返回按平均方向从小到大编号的组号。"""
+    theta=np.asarray(theta,dtype=np.float64)
+    if k<=1 or len(theta)<=k:
+        return np.zeros(len(theta),dtype=np.int64)
+    weights=np.ones(len(theta)) if weights is None else np.asarray(weights,dtype=np.float64)
+    v=np.column_stack((np.cos(2*theta),np.sin(2*theta)))                       #角度加倍后变为普通的单位向量
+    centers=np.quantile(2*theta,(np.arange(k)+0.5)/k)
+    centers=np.column_stack((np.cos(centers),np.sin(centers)))
+    for _ in range(iterations):
+        labels=np.argmax(v@centers.T,axis=1)
+        sums=np.stack([np.bincount(labels,weights*v[:,d],minlength=k) for d in (0,1)],axis=1)
+        norm=np.hypot(sums[:,0],sums[:,1])
+        empty=norm==0
+        sums[empty]=centers[empty]
+        norm[empty]=1
+        new=sums/norm[:,None]
+        if np.allclose(new,centers):
+            break
+        centers=new
+    order=np.argsort(np.mod(np.arctan2(centers[:,1],centers[:,0]),2*np.pi))
+    return np.argsort(order)[labels]
+
+def segment_statistics(segments,branch,shape,pixel_size=1):
+    """单张迹线图的统计量（长度单位为pixel_size换算后的单位）。"""
+    d=(segments[:,0,:]-segments[:,1,:])*pixel_size
+    length=np.hypot(d[:,0],d[:,1])
+    _,branch_id=np.unique(branch,return_inverse=True)
+    trace_length=np.bincount(branch_id,length)                                  #每条迹线（分支）的长度
+    theta=np.mod(np.arctan2(d[:,1],d[:,0]),np.pi)
+    area=shape[0]*shape[1]*pixel_size**2
+    return {'segments':len(length),
+            'traces':len(trace_length),
+            'P20':len(trace_length)/area,
+            'P21':float(length.sum()/area),
+            'trace_length_mean':float(trace_length.mean()) if len(trace_length) else 0.0,
+            'trace_length_std':float(trace_length.std()) if len(trace_length) else 0.0,
+            'direction_hist':np.histogram(np.rad2deg(theta),bins=18,range=(0,180),weights=length)[0].tolist()}
+
+#带缓存的批处理---------------------------------------------------------------
+def file_hash(path):
+    h=hashlib.sha1()
+    with open(path,'rb') as f:
+        for block in iter(lambda: f.read(1<<20),b''):
+            h.update(block)
+    return h.hexdigest()
+
+def _cache_file(cache_dir,digest,params):
+    tag=hashlib.sha1(repr((CACHE_VERSION,params)).encode()).hexdigest()[:8]   #参数不同时分开缓存
+    return os.path.join(cache_dir,digest+'_'+tag+'.npz')
+
+def _ingest_one(args):
+    path,cache_file,params=args
+    image=read_image(path)
+    segments,branch=trace_segments(image,params['piece'],params['min_pixels'],params['threshold'])
+    result={'path':path,'shape':image.shape,'segments':segments,'branch':branch,
+            'stats':segment_statistics(segments,branch,image.shape,params['pixel_size'])}
+    if cache_file is not None:
+        np.savez(cache_file,segments=segments,branch=branch,shape=np.array(image.shape))
+    return result
+
+def _load_cached(path,cache_file,pixel_size):
+    with np.load(cache_file) as f:
+        segments,branch,shape=f['segments'],f['branch'],tuple(f['shape'])
+    return {'path':path,'shape':shape,'segments':segments,'branch':branch,
+            'stats':segment_statistics(segments,branch,shape,pixel_size)}
+
+def ingest_images(paths,cache_dir=None,processes=None,batch_size=16,piece=50,min_pixels=5,threshold=0.5,pixel_size=0.1):
+    """批量提取迹线图的线段和统计量，按路径顺序返回结果列表。
+
+    每张图的结果以文件内容的sha1（及提取参数）为键缓存在cache_dir中，再次运行时直接读取；
+    未缓存的图按batch_size分批交给进程池，由子进程各自读图，processes<=1时在当前进程内计算。
+    """
+    params={'piece':piece,'min_pixels':min_pixels,'threshold':threshold,'pixel_size':pixel_size}
+    key_params=(piece,min_pixels,threshold)
+    paths=list(paths)
+    if cache_dir is not None:
+        os.makedirs(cache_dir,exist_ok=True)
+    results=[None]*len(paths)
+    tasks=[]
+    for i,path in enumerate(paths):
+        cache_file=None if cache_dir is None else _cache_file(cache_dir,file_hash(path),key_params)
+        if cache_file is not None and os.path.exists(cache_file):
+            results[i]=_load_cached(path,cache_file,pixel_size)
+        else:
+            tasks.append((i,(path,cache_file,params)))
+    processes=os.cpu_count() if processes is None else processes
+    pool=ProcessPoolExecutor(processes) if processes>1 and len(tasks)>1 else None
+    try:
+        for k in range(0,len(tasks),batch_size):
+            batch=tasks[k:k+batch_size]
+            mapped=pool.map(_ingest_one,[t for _,t in batch]) if pool else map(_ingest_one,[t for _,t in batch])
+            for (i,_),result in zip(batch,mapped):
+                results[i]=result
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    return results
+
+def trace_map(result,groups=1,pixel_size=0.1):
+    """把ingest_images的一项结果转成Draw图，按方向分成groups组，可直接用于similarity_analysis。"""
+    segments=result['segments']*pixel_size
+    shape=result['shape']
+    crack_map=Draw((shape[1]*pixel_size,shape[0]*pixel_size))
+    center=segments.mean(axis=1)
+    d=segments[:,0,:]-segments[:,1,:]
+    length=np.hypot(d[:,0],d[:,1])
+    theta=np.mod(np.arctan2(d[:,1],d[:,0]),np.pi)
+    labels=axial_groups(theta,groups,length)
+    area=crack_map.x_max*crack_map.y_max
+    for k in range(labels.max()+1 if len(labels) else 0):
+        rows=labels==k
+        if not rows.any():
+            continue
+        crack_map.cracks.append_set(center[rows,0],center[rows,1],theta[rows],length[rows])
+        crack_map.spacing_collection.append(float(area/length[rows].sum()))        #间距用1/P21估计
+        crack_map.configs.append({'name':os.path.basename(result['path'])+'-'+str(k),
+                                  'spacing':crack_map.spacing_collection[-1],
+                                  'theta':float(np.rad2deg(axial_mean(theta[rows]))),
+                                  'number':int(rows.sum()),
+                                  'length':float(length[rows].mean())})
+    return crack_map
+
+#Image samples数据集------------------------------------------------------------
+def load_distribution(path):
+    """读取data-distribution.csv，返回{图片编号: {列名: 数值}}。"""
+    table={}
+    with open(path,newline='',encoding='utf-8-sig') as f:
+        for row in csv.DictReader(f):
+            values={}
+            for name,value in row.items():
+                try:
+                    values[name]=float(value)
+                except (TypeError,ValueError):
+                    values[name]=value
+            table[int(values.pop('No.'))]=values
+    return table
+
+def load_dataset(root,cache_dir=None,processes=None,pixel_size=0.1,**kwargs):
+    """读取Image samples目录：用label中的迹线图生成Draw图，组数取自data-distribution.csv的groups列。
+
+    返回{图片编号: (Draw图, 统计量, csv中的数据)}。
+    """
+    distribution=load_distribution(os.path.join(root,'data-distribution.csv'))
+    label_dir=os.path.join(root,'label')
+    numbers=sorted(int(os.path.splitext(name)[0]) for name in os.listdir(label_dir) if name.endswith('.png'))
+    results=ingest_images([os.path.join(label_dir,str(n)+'.png') for n in numbers],cache_dir,processes,pixel_size=pixel_size,**kwargs)
+    dataset={}
+    for n,result in zip(numbers,results):
+        row=distribution.get(n,{})
+        dataset[n]=(trace_map(result,int(row.get('groups',1)),pixel_size),result['stats'],row)
+    return dataset
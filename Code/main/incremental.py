@@ -0,0 +1,334 @@
+import numpy as np
+from bisect import bisect_left
+
+from crack import CrackTable,crack_batch
+from draw import Draw
+from raster import _segment_pieces,_grid_size,cell_areas,cell_statistics
+from intersection import segment_intersections,find_intersections
+from similarity_metrics import score_features
+
+class IncrementalMap():
+    """可逐条增删、移动裂隙的裂隙图，随时维护相似度计算要用的中间量：
+
+    P21密度网格、位置网格（段长加权的重心）、每组长度和倾角的充分统计量及排序样本、
+    空间哈希和交点个数。增删一条裂隙只更新它经过的网格和包围盒附近的裂隙，
+    features()的结果与similarity_metrics.map_features格式相同，可直接传给score_features。
+    """
+    def __init__(self,draw_obj,magnifier_index2=1/15,density_index=6,cell_size=None,same_set=False):
+        self.x_max,self.y_max=draw_obj.x_max,draw_obj.y_max
+        self.magnifier_index2=magnifier_index2
+        self.density_index=density_index
+        self.same_set=same_set                                                  #交点是否包括同组裂隙之间的交点
+        cracks=draw_obj.cracks
+        self.cell_size=cell_size if cell_size is not None else max(float(np.mean(cracks.length)) if len(cracks) else 1.0,1e-9)
+        self.spacing=list(draw_obj.get_spacing())
+        size_x,size_y=_grid_size(self.x_max,self.y_max,magnifier_index2,magnifier_index2)
+        self._density_length=np.zeros((size_y,size_x))                          #各网格内的迹线长度
+        self._density_count=np.zeros((size_y,size_x),dtype=np.int64)            #各网格内的小段数，用于判断网格是否为空
+        self._areas=cell_areas(self.x_max,self.y_max,magnifier_index2)
+        self._gravity=np.zeros((density_index,density_index,3))                 #各网格的 Σw、Σw·x、Σw·y
+        self._gravity_count=np.zeros((density_index,density_index),dtype=np.int64)
+        self._sets=[]                                                           #每组的 n、Σl、Σl²、Σcos2θ、Σsin2θ
+        self._set_lengths,self._set_directions=[],[]                            #每组排序后的长度、倾角（角度制）
+        self._lengths,self._directions=_SortedSamples(),_SortedSamples()        #所有组合在一起的排序样本
+        self._endpoints=np.empty((0,2,2))                                       #以裂隙号为行号的记录：端点(2,2)
+        self._theta,self._length=np.empty(0),np.empty(0)                        #倾角、长度
+        self._set_id=np.empty(0,dtype=np.int64)                                 #组号
+        self._alive=np.empty(0,dtype=bool)                                      #该裂隙号是否还在图中
+        self._count=0
+        self._cell_keys=np.empty(0,dtype=np.int64)                              #_build时的空间哈希（CSR）：排序的网格键、
+        self._cell_start=np.zeros(1,dtype=np.int64)                             #各网格在_cell_ids中的起点、
+        self._cell_ids=np.empty(0,dtype=np.int64)                               #各网格的裂隙号
+        self._grid={}                                                           #之后插入的裂隙：网格键 -> 裂隙号集合
+        self.intersection_count=0
+        self._next_id=0
+        for k in range(cracks.group_num):
+            self._new_set()
+        if len(cracks):
+            self._build(cracks)
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def group_num(self):
+        return len(self._sets)
+
+    def _new_set(self):
+        self._sets.append(np.zeros(5))
+        self._set_lengths.append(_SortedSamples())
+        self._set_directions.append(_SortedSamples())
+
+    def _reserve(self,n):                                                       #裂隙号记录的容量不足时按倍数扩容
+        if n<=len(self._alive):
+            return
+        capacity=max(n,2*len(self._alive),256)
+        def grow(values):
+            return np.concatenate((values,np.zeros((capacity-len(values),)+values.shape[1:],dtype=values.dtype)))
+        self._endpoints,self._theta,self._length,self._set_id,self._alive=map(
+            grow,(self._endpoints,self._theta,self._length,self._set_id,self._alive))
+
+    def _build(self,cracks):
+        """由整张裂隙表一次算出所有中间量，结果与逐条add()相同；裂隙号为表中的行号。"""
+        n=len(cracks)
+        endpoints=np.array(cracks.endpoints)
+        theta=np.mod(cracks.theta,np.pi)
+        length=np.array(cracks.length)
+        set_id=np.array(cracks.set_id)
+        self._endpoints,self._theta,self._length,self._set_id=endpoints,theta,length,set_id
+        self._alive=np.ones(n,dtype=bool)
+        self._count=n
+        #密度网格
+        size_y,size_x=self._density_length.shape
+        _,col,row,piece_len,_=_segment_pieces(endpoints,self.x_max,self.y_max,self.magnifier_index2,self.magnifier_index2)
+        self._density_length+=np.bincount(row*size_x+col,piece_len,minlength=size_x*size_y).reshape(size_y,size_x)
+        self._density_count+=np.bincount(row*size_x+col,minlength=size_x*size_y).reshape(size_y,size_x)
+        #位置网格：由重心和长度还原 Σw、Σw·x、Σw·y
+        stats=cell_statistics(self.x_max,self.y_max,self.density_index,endpoints=endpoints)
+        filled=stats['length']>0
+        self._gravity[...,0]=stats['length']
+        self._gravity[...,1:]=np.where(filled[...,None],stats['centroid']*stats['length'][...,None],0.0)
+        self._gravity_count+=stats['count']
+        #各组的充分统计量和排序样本
+        sums=np.stack([np.bincount(set_id,values,minlength=self.group_num)
+                       for values in (np.ones(n),length,length*length,np.cos(2*theta),np.sin(2*theta))],axis=1)
+        self._sets=list(sums)
+        directions=np.rad2deg(theta)
+        self._lengths=_SortedSamples(np.sort(length))
+        self._directions=_SortedSamples(np.sort(directions))
+        for i,rows in enumerate(cracks.group_slices()):
+            self._set_lengths[i]=_SortedSamples(np.sort(length[rows]))
+            self._set_directions[i]=_SortedSamples(np.sort(directions[rows]))
+        #空间哈希：每条裂隙登记到包围盒覆盖的所有网格
+        lo=np.floor(endpoints.min(axis=1)/self.cell_size).astype(np.int64)
+        hi=np.floor(endpoints.max(axis=1)/self.cell_size).astype(np.int64)
+        span_x,span_y=hi[:,0]-lo[:,0]+1,hi[:,1]-lo[:,1]+1
+        counts=span_x*span_y
+        seg=np.repeat(np.arange(n),counts)
+        m=np.arange(counts.sum())-np.repeat(np.cumsum(counts)-counts,counts)
+        cell_x,cell_y=lo[seg,0]+m//span_y[seg],lo[seg,1]+m%span_y[seg]
+        keys=_cell_key(cell_x,cell_y)
+        order=np.argsort(keys,kind='stable')
+        self._cell_ids=seg[order]
+        self._cell_keys,start=np.unique(keys[order],return_index=True)
+        self._cell_start=np.append(start,len(order))
+        #交点
+        _,pairs=find_intersections(cracks,self.same_set)
+        self.intersection_count=len(pairs)
+        self._next_id=n
+
+    def _cells(self,endpoints):                                                 #包围盒覆盖的空间哈希网格键
+        lo=np.floor(endpoints.min(axis=0)/self.cell_size).astype(np.int64)
+        hi=np.floor(endpoints.max(axis=0)/self.cell_size).astype(np.int64)
+        cell_x,cell_y=np.meshgrid(np.arange(lo[0],hi[0]+1),np.arange(lo[1],hi[1]+1),indexing='ij')
+        return _cell_key(cell_x.ravel(),cell_y.ravel())
+
+    def _neighbours(self,crack_id,keys):
+        """与该裂隙共用空间哈希网格、需要求交的其他裂隙号。
+
+        _build登记的网格不随删除、移动更新，其中可能有已删除或已移走的裂隙：
+        删除的由_alive滤掉，移走的按当前端点求交时自然不相交。
+        """
+        parts=[]
+        if len(self._cell_keys):
+            pos=np.minimum(np.searchsorted(self._cell_keys,keys),len(self._cell_keys)-1)
+            for p in pos[self._cell_keys[pos]==keys].tolist():
+                parts.append(self._cell_ids[self._cell_start[p]:self._cell_start[p+1]])
+        for key in keys.tolist():
+            if self._grid.get(key):
+                parts.append(np.fromiter(self._grid[key],dtype=np.int64))
+        if not parts:
+            return np.empty(0,dtype=np.int64)
+        others=np.unique(np.concatenate(parts))
+        others=others[self._alive[others] & (others!=crack_id)]
+        if not self.same_set:
+            others=others[self._set_id[others]!=self._set_id[crack_id]]
+        return others
+
+    def _crossing_count(self,crack_id,keys):                                    #该裂隙与其他裂隙的交点个数
+        others=self._neighbours(crack_id,keys)
+        own=np.broadcast_to(self._endpoints[crack_id],(len(others),2,2))
+        first=(crack_id<others)[:,None,None]                                    #与find_intersections一样，裂隙号小的作第一条线段，插入和删除时的判断完全一致
+        p,q=np.where(first,own,self._endpoints[others]),np.where(first,self._endpoints[others],own)
+        crossing,_,_=segment_intersections(p[:,0],p[:,1],q[:,0],q[:,1])
+        return int(crossing.sum())
+
+    def _rasterize(self,endpoints,sign):                                       #把一条裂隙加到（sign=-1时减去）密度和位置网格中
+        _,col,row,piece_len,_=_segment_pieces(endpoints[None],self.x_max,self.y_max,self.magnifier_index2,self.magnifier_index2)
+        np.add.at(self._density_length,(row,col),sign*piece_len)
+        np.add.at(self._density_count,(row,col),sign)
+        d=self.density_index
+        _,col,row,piece_len,mid=_segment_pieces(endpoints[None],self.x_max,self.y_max,d/self.x_max,d/self.y_max)
+        np.add.at(self._gravity,(col,row),sign*np.column_stack((piece_len,piece_len*mid[:,0],piece_len*mid[:,1])))
+        np.add.at(self._gravity_count,(col,row),sign)
+
+    def add(self,x,y,theta,length,set_id=0):
+        """加入一条裂隙，返回它的裂隙号；set_id等于组数时新建一组。"""
+        crack_id=self._next_id
+        self._next_id+=1
+        self._insert(crack_id,x,y,theta,length,set_id)
+        return crack_id
+
+    def _insert(self,crack_id,x,y,theta,length,set_id):
+        while set_id>=len(self._sets):
+            self._new_set()
+            self.spacing.append(np.nan)                                         #新组的间距在features()中按1/P21估计
+        endpoints=crack_batch(x,y,theta,length)[4:8,0].reshape(2,2)
+        theta=float(np.mod(theta,np.pi))
+        self._reserve(crack_id+1)
+        self._endpoints[crack_id]=endpoints
+        self._theta[crack_id],self._length[crack_id],self._set_id[crack_id]=theta,length,set_id
+        self._alive[crack_id]=True
+        self._count+=1
+        self._rasterize(endpoints,1)
+        self._sets[set_id]+=(1,length,length*length,np.cos(2*theta),np.sin(2*theta))
+        for samples,value in ((self._set_lengths[set_id],length),(self._lengths,length),
+                              (self._set_directions[set_id],np.rad2deg(theta)),(self._directions,np.rad2deg(theta))):
+            samples.add(value)
+        #只与空间哈希中相邻的裂隙求交
+        keys=self._cells(endpoints)
+        for key in keys.tolist():
+            self._grid.setdefault(key,set()).add(crack_id)
+        self.intersection_count+=self._crossing_count(crack_id,keys)
+
+    def remove(self,crack_id):
+        """删除一条裂隙，返回它的(x,y,theta,length,set_id)。"""
+        if not 0<=crack_id<self._next_id or not self._alive[crack_id]:
+            raise KeyError(crack_id)
+        endpoints=self._endpoints[crack_id].copy()
+        theta,length,set_id=float(self._theta[crack_id]),float(self._length[crack_id]),int(self._set_id[crack_id])
+        keys=self._cells(endpoints)
+        self.intersection_count-=self._crossing_count(crack_id,keys)
+        for key in keys.tolist():
+            self._grid.get(key,set()).discard(crack_id)
+        self._alive[crack_id]=False
+        self._count-=1
+        self._rasterize(endpoints,-1)
+        self._sets[set_id]-=(1,length,length*length,np.cos(2*theta),np.sin(2*theta))
+        for samples,value in ((self._set_lengths[set_id],length),(self._lengths,length),
+                              (self._set_directions[set_id],np.rad2deg(theta)),(self._directions,np.rad2deg(theta))):
+            samples.remove(value)
+        x,y=endpoints.mean(axis=0)
+        return x,y,theta,length,set_id
+
+    def move(self,crack_id,x=None,y=None,theta=None,length=None,set_id=None):   #修改一条裂隙，未给出的参数保持不变，裂隙号不变
+        old=self.remove(crack_id)
+        new=[old[k] if v is None else v for k,v in enumerate((x,y,theta,length,set_id))]
+        self._insert(crack_id,*new)
+
+    #当前状态---------------------------------------------------------------------
+    def density(self):                                                          #与segment_density相同的P21矩阵
+        return np.where(self._density_count>0,self._density_length,0.0)/self._areas
+
+    def gravity_centers(self):                                                  #段长加权的网格重心，空网格为(-1,-1)
+        w=self._gravity[...,0]
+        filled=self._gravity_count>0
+        centers=np.full(w.shape+(2,),-1.0)
+        centers[filled]=self._gravity[filled][:,1:]/w[filled][:,None]
+        return centers
+
+    def set_statistics(self):
+        """每组的裂隙数、平均长度、长度标准差、平均倾向（角度制，[0,180)），由充分统计量直接算出。"""
+        s=np.array(self._sets).reshape(-1,5)
+        n=np.maximum(s[:,0],1)
+        mean=s[:,1]/n
+        return {'count':s[:,0].astype(np.int64),
+                'mean_length':mean,
+                'std_length':np.sqrt(np.maximum(s[:,2]/n-mean**2,0)),
+                'direction':np.mod(np.rad2deg(0.5*np.arctan2(s[:,4],s[:,3])),180)}
+
+    def features(self):
+        """与map_features格式相同的特征。位置重心按段长加权（map_features按取点计算，两者只差取点误差）。"""
+        stats=self.set_statistics()
+        area=self.x_max*self.y_max
+        spacing=np.array([s if np.isfinite(s) else area/max(stats['count'][k]*stats['mean_length'][k],1e-12)
+                          for k,s in enumerate(self.spacing)])
+        return {'size':(self.x_max,self.y_max),
+                'group_num':self.group_num,
+                'directions':self._directions.values(),
+                'lengths':self._lengths.values(),
+                'set_directions':np.where(stats['count']>0,stats['direction'],np.nan),
+                'set_lengths':[s.values() for s in self._set_lengths],
+                'spacing':spacing,
+                'density':self.density(),
+                'gravity':self.gravity_centers()}
+
+    def score(self,reference_features,weights=None):                            #与固定参考图（map_features或features()的结果）的综合相似度
+        return score_features(reference_features,self.features(),weights)
+
+    def to_draw(self):                                                          #按当前裂隙生成新的Draw图（同组连续存放）
+        draw_obj=Draw((self.x_max,self.y_max))
+        ids=np.flatnonzero(self._alive[:self._next_id])
+        ids=ids[np.argsort(self._set_id[ids],kind='stable')]
+        set_id,theta,length=self._set_id[ids],self._theta[ids],self._length[ids]
+        center=self._endpoints[ids].mean(axis=1)
+        draw_obj.cracks=CrackTable()
+        for k in range(self.group_num):
+            rows=set_id==k
+            draw_obj.cracks.append_set(center[rows,0],center[rows,1],theta[rows],length[rows])
+        draw_obj.spacing_collection=list(self.features()['spacing'])
+        return draw_obj
+
+def _cell_key(cell_x,cell_y):                                                  #网格(x,y)编成一个整数键，|y|须小于2**31
+    return np.asarray(cell_x,dtype=np.int64)*(1<<32)+np.asarray(cell_y,dtype=np.int64)
+
+class _SortedSamples():
+    """分块存放的有序样本：每块是一个有序数组，块长超过2*chunk时对半拆开。
+
+    插入、删除先按各块的最大值二分找到所在的块，只改动这一块，代价为O(chunk)而不是O(n)。
+    values()拼接各块的结果缓存到下一次修改，不再重新排序。
+    """
+    def __init__(self,values=None,chunk=512):                                   #values须已排序
+        values=np.empty(0) if values is None else np.asarray(values,dtype=np.float64)
+        self.chunk=chunk
+        self._blocks=[values[i:i+chunk] for i in range(0,len(values),chunk)]
+        self._maxes=[float(b[-1]) for b in self._blocks]                        #各块的最大值
+        self._values=None                                                       #values()的缓存，修改时清空
+
+    def __len__(self):
+        return sum(len(b) for b in self._blocks)
+
+    def values(self):                                                           #全部样本，已排序（只读）
+        if self._values is None:
+            self._values=np.concatenate(self._blocks) if self._blocks else np.empty(0)
+            self._values.flags.writeable=False
+        return self._values
+
+    def add(self,value):
+        value=float(value)
+        self._values=None
+        if not self._blocks:
+            self._blocks.append(np.array([value]))
+            self._maxes.append(value)
+            return
+        k=min(bisect_left(self._maxes,value),len(self._blocks)-1)
+        block=self._blocks[k]
+        block=np.insert(block,np.searchsorted(block,value),value)
+        if len(block)>2*self.chunk:
+            half=len(block)//2
+            self._blocks[k:k+1]=[block[:half],block[half:]]
+            self._maxes[k:k+1]=[float(block[half-1]),float(block[-1])]
+        else:
+            self._blocks[k]=block
+            self._maxes[k]=float(block[-1])
+
+    def remove(self,value):
+        value=float(value)
+        self._values=None
+        k=min(bisect_left(self._maxes,value),len(self._blocks)-1)
+        block=self._blocks[k]
+        i=min(np.searchsorted(block,value),len(block)-1)
+        if block[i]!=value:                                                     #浮点误差时取最接近的一项
+            k,i=self._nearest(value)
+            block=self._blocks[k]
+        block=np.delete(block,i)
+        if len(block):
+            self._blocks[k]=block
+            self._maxes[k]=float(block[-1])
+        else:
+            del self._blocks[k],self._maxes[k]
+
+    def _nearest(self,value):                                                   #最接近value的样本所在的(块号,块内位置)
+        gaps=[np.min(np.abs(b-value)) for b in self._blocks]
+        k=int(np.argmin(gaps))
+        return k,int(np.argmin(np.abs(self._blocks[k]-value)))
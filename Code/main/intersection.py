@@ -1,58 +1,96 @@
-from matplotlib import pyplot as plt
-from crack import Crack
-import matplotlib.pyplot as plt
+import numpy as np
+
+from profiling import timed,count
+
+def segment_intersections(p1,p2,q1,q2,eps=1e-9):
+    """批量判断线段p1p2与q1q2是否相交（各参数为(n,2)数组）。
+
+    用叉积求两端点到另一条线段所在直线的有向距离，距离绝对值不超过eps视为在线上，
+    端点恰好落在另一条线段上也算相交；平行或共线的线段不算相交。
+    返回相交掩码及交点的x、y坐标（不相交处为nan）。
+    """
+    p1,p2,q1,q2=(np.asarray(v,dtype=np.float64).reshape(-1,2) for v in (p1,p2,q1,q2))
+    r,s=p2-p1,q2-q1
+    len_r,len_s=np.hypot(r[:,0],r[:,1]),np.hypot(s[:,0],s[:,1])
+    def side(dist):                                                             #有向距离小于eps的归零
+        return np.where(np.abs(dist)<=eps,0.0,dist)
+    with np.errstate(divide='ignore',invalid='ignore'):
+        d1=side((s[:,0]*(p1[:,1]-q1[:,1])-s[:,1]*(p1[:,0]-q1[:,0]))/len_s)    #p1、p2到直线q的距离
+        d2=side((s[:,0]*(p2[:,1]-q1[:,1])-s[:,1]*(p2[:,0]-q1[:,0]))/len_s)
+        d3=side((r[:,0]*(q1[:,1]-p1[:,1])-r[:,1]*(q1[:,0]-p1[:,0]))/len_r)    #q1、q2到直线p的距离
+        d4=side((r[:,0]*(q2[:,1]-p1[:,1])-r[:,1]*(q2[:,0]-p1[:,0]))/len_r)
+        crossing=(d1*d2<=0) & (d3*d4<=0) & (d1!=d2) & (d3!=d4) & (len_r>0) & (len_s>0)
+        t=d1/(d1-d2)
+    t=np.where(crossing,t,np.nan)
+    x=p1[:,0]+t*r[:,0]
+    y=p1[:,1]+t*r[:,1]
+    return crossing,x,y
+
 def intersect(line1,line2):
-    intersect_or_not=False
-    x,y=0,0
-    p11x,p11y=line1.p1[0],line1.p1[1]
-    p12x,p12y=line1.p2[0],line1.p2[1]
-    p21x,p21y=line2.p1[0],line2.p1[1]
-    p22x,p22y=line2.p2[0],line2.p2[1]
-    len1,len2=line1.length,line2.length
-    
-    c1x,c1y=line1.x,line1.y
-    c2x,c2y=line2.x,line2.y
-    distance=(c1x-c2x)**2+(c1y-c2y)**2
-    lenlen=0.25*(len1+len2)**2
-    
-    if distance>lenlen:
-        return intersect_or_not,x,y
-    else:
-        if (p11x*p12y-p12x*p11y)!=0 and (p21x*p22y-p22x*p21y)!=0:
-            a1,a2=(p11y-p12y)/(p11x*p12y-p12x*p11y),(p21y-p22y)/(p21x*p22y-p22x*p21y)
-            b1,b2=(p12x-p11x)/(p11x*p12y-p12x*p11y),(p22x-p21x)/(p21x*p22y-p22x*p21y)
-            c1,c2=1,1
+    crossing,x,y=segment_intersections(line1.p1,line1.p2,line2.p1,line2.p2)
+    if crossing[0]:
+        return True,x[0],y[0]
+    return False,0,0
 
-            if (a1*b2-a2*b1)!=0:
-                x=((b1*c2-b2*c1)/(a1*b2-a2*b1))
-                y=((a2*c1-a1*c2)/(a1*b2-a2*b1))
-                if x < max(p11x,p12x) and x > min(p11x,p12x) and  y < max(p11y,p12y) and y > min(p11y,p12y) and x < max(p21x,p22x) and x > min(p21x,p22x) and y < max(p21y,p22y) and y > min(p21y,p22y):
-                    intersect_or_not=True
-            
-        return intersect_or_not,x,y
+@timed('intersection.candidate_pairs')
+def candidate_pairs(endpoints,cell_size=None):
+    """用均匀网格（空间哈希）找出包围盒相交的裂隙对，返回(M,2)的行号对，且i<j。"""
+    endpoints=np.asarray(endpoints,dtype=np.float64).reshape(-1,2,2)
+    n=len(endpoints)
+    if n<2:
+        return np.empty((0,2),dtype=np.int64)
+    lo,hi=endpoints.min(axis=1),endpoints.max(axis=1)                          #每条裂隙的包围盒
+    if cell_size is None:                                                       #默认网格边长取裂隙平均长度
+        cell_size=max(float(np.mean(np.hypot(*(hi-lo).T))),1e-9)
+    origin=lo.min(axis=0)
+    c0=np.floor((lo-origin)/cell_size).astype(np.int64)
+    c1=np.floor((hi-origin)/cell_size).astype(np.int64)
+    nx=int(c1[:,0].max())+1
+    #把每条裂隙登记到它包围盒覆盖的所有网格中
+    span_x,span_y=c1[:,0]-c0[:,0]+1,c1[:,1]-c0[:,1]+1
+    counts=span_x*span_y
+    seg=np.repeat(np.arange(n),counts)
+    k=np.arange(counts.sum())-np.repeat(np.cumsum(counts)-counts,counts)
+    cell=(c0[seg,1]+k//span_x[seg])*nx+(c0[seg,0]+k%span_x[seg])
+    order=np.argsort(cell,kind='stable')
+    cell,seg=cell[order],seg[order]
+    #同一网格内两两组合
+    _,first,sizes=np.unique(cell,return_index=True,return_counts=True)
+    pos=np.arange(len(cell))-np.repeat(first,sizes)
+    partners=np.repeat(sizes,sizes)-pos-1
+    i=np.repeat(seg,partners)
+    offset=np.arange(partners.sum())-np.repeat(np.cumsum(partners)-partners,partners)
+    at=np.repeat(np.arange(len(cell)),partners)
+    j=seg[at+1+offset]
+    i,j=np.minimum(i,j),np.maximum(i,j)
+    overlap=np.all((lo[i]<=hi[j]) & (lo[j]<=hi[i]),axis=1)
+    i,j,at=i[overlap],j[overlap],at[overlap]
+    #跨网格的重复组合只保留一次：只在两包围盒交集左下角所在的网格中保留
+    corner=np.floor((np.maximum(lo[i],lo[j])-origin)/cell_size).astype(np.int64)
+    keep=corner[:,1]*nx+corner[:,0]==cell[at]
+    i,j=i[keep],j[keep]
+    order=np.argsort(i*n+j)
+    return np.column_stack((i[order],j[order]))
 
-def get_intersection_points(experiment_obj):
-    intersection_points=[]
-    groups=len(experiment_obj.get_length())
+@timed('intersection.find_intersections')
+def find_intersections(cracks,same_set=False,cell_size=None):
+    """返回裂隙表中所有交点坐标(K,2)及对应的裂隙行号对(K,2)；same_set为False时跳过同组裂隙。"""
+    pairs=candidate_pairs(cracks.endpoints,cell_size)
+    if not same_set:
+        set_id=cracks.set_id
+        pairs=pairs[set_id[pairs[:,0]]!=set_id[pairs[:,1]]]
+    endpoints=cracks.endpoints
+    crossing,x,y=segment_intersections(endpoints[pairs[:,0],0],endpoints[pairs[:,0],1],
+                                       endpoints[pairs[:,1],0],endpoints[pairs[:,1],1])
+    count('intersection.pairs_tested',len(pairs))
+    count('intersection.points',crossing.sum())
+    return np.column_stack((x[crossing],y[crossing])),pairs[crossing]
 
-    for i in range(groups-1):
-        for j in range(i+1,groups):
-            for k in range(len(experiment_obj.get_centerpoints()[i])):
-                crack1 = Crack(x = experiment_obj.get_centerpoints()[i][k][0],
-                               y = experiment_obj.get_centerpoints()[i][k][1],
-                               theta = experiment_obj.get_directions()[i][k],
-                               length = experiment_obj.get_length()[i][k]
-                               )
-                for m in range(len(experiment_obj.get_centerpoints()[j])):
-                    crack2 = Crack(x = experiment_obj.get_centerpoints()[j][m][0],
-                                   y = experiment_obj.get_centerpoints()[j][m][1],
-                                   theta = experiment_obj.get_directions()[j][m],
-                                   length = experiment_obj.get_length()[j][m]
-                                   )
-                    intersect_or_not,x,y=intersect(crack1,crack2)
-                    if intersect_or_not:
-                        intersection_points.append((x,y))
-                        plt.scatter(x,y, marker='P', edgecolors='k')
+def get_intersection_points(experiment_obj,same_set=False):
+    import matplotlib.pyplot as plt                                             #只在画图时才导入matplotlib
+    intersection_points,_=find_intersections(experiment_obj.cracks,same_set)
+    for x,y in intersection_points:
+        plt.scatter(x,y, marker='P', edgecolors='k')
     
     experiment_obj.plot()                   
-    return len(intersection_points)
\ No newline at end of file
+    return len(intersection_points)
@@ -11,7 +11,7 @@ if __name__ =='__main__':
     plt.rcParams['figure.figsize'] = [20,20]
     plt.rcParams['figure.dpi'] = 144
     plt.rcParams['font.size'] =20
-    crack_map1 = Draw((60,60))
+    crack_map1 = Draw((60,60),seed=5)
     crack_map1.generate_crack(
         [
 
@@ -27,7 +27,7 @@ if __name__ =='__main__':
     plt.rcParams['figure.figsize'] = [20,20]
     plt.rcParams['figure.dpi'] = 144
     plt.rcParams['font.size'] =20
-    crack_map2 = Draw((60,60))
+    crack_map2 = Draw((60,60),seed=6)
     crack_map2.generate_crack(
         [
             {'name':'set1','spacing':6,'theta':55,'number':50,'length':4},
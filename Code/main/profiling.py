@@ -0,0 +1,187 @@
+import atexit
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+#分阶段计时和计数。默认关闭，关闭时stage()返回共享的空上下文、count()只判断一次None，几乎没有开销。
+#开启方法：
+#   with profile() as prof:                 #在代码中开启，退出后从prof读取或导出结果
+#       ...
+#   FRACTURE_PROFILE=1 python main.py               #用环境变量开启，程序退出时打印各阶段的表格
+#   FRACTURE_PROFILE=out.json python main.py        #用环境变量开启，程序退出时写出汇总JSON
+#   FRACTURE_PROFILE=out.trace.json python main.py  #文件名以.trace.json结尾时写出Chrome trace（chrome://tracing、Perfetto）
+#   FRACTURE_PROFILE_MEMORY=1 同时记录各阶段的内存分配峰值（tracemalloc，会明显变慢）
+#环境变量方式只写出主进程的记录，进程池中子进程的记录不写出。
+
+_ACTIVE=None                                                                    #当前的Profile，为None时不记录
+_NULL=contextlib.nullcontext()
+
+class Profile():
+    """一次记录的结果：events为[(名称,开始,耗时,进程号,线程号,内存峰值), ...]（秒、字节），counters为计数。"""
+    def __init__(self,track_memory=False):
+        self.track_memory=track_memory
+        self.events=[]
+        self.counters={}
+        self.origin=time.perf_counter()
+        self._local=threading.local()                                           #各线程自己的内存峰值栈
+        self._lock=threading.Lock()
+
+    def _stack(self):
+        stack=getattr(self._local,'stack',None)
+        if stack is None:
+            stack=self._local.stack=[]
+        return stack
+
+    def _enter(self):
+        if self.track_memory:
+            #tracemalloc只有一个全局峰值：进入子阶段前把父阶段到此为止的峰值存下，再清零
+            current,peak=tracemalloc.get_traced_memory()
+            stack=self._stack()
+            if stack:
+                stack[-1][1]=max(stack[-1][1],peak)
+            stack.append([current,0])
+            tracemalloc.reset_peak()
+        return time.perf_counter()
+
+    def _exit(self,name,start):
+        end=time.perf_counter()
+        peak=None
+        if self.track_memory:
+            stack=self._stack()
+            base,saved=stack.pop()
+            top=max(saved,tracemalloc.get_traced_memory()[1])
+            if stack:
+                stack[-1][1]=max(stack[-1][1],top)
+            peak=top-base
+        with self._lock:
+            self.events.append((name,start-self.origin,end-start,os.getpid(),threading.get_ident(),peak))
+
+    def count(self,name,n=1):
+        with self._lock:
+            self.counters[name]=self.counters.get(name,0)+n
+
+    def summary(self):
+        """按阶段汇总：{'stages':{名称:{'calls','total','mean','max','peak_bytes'}}, 'counters':{...}}，时间单位为秒。"""
+        stages={}
+        for name,_,duration,_,_,peak in self.events:
+            s=stages.setdefault(name,{'calls':0,'total':0.0,'max':0.0,'peak_bytes':None})
+            s['calls']+=1
+            s['total']+=duration
+            s['max']=max(s['max'],duration)
+            if peak is not None:
+                s['peak_bytes']=max(s['peak_bytes'] or 0,peak)
+        for s in stages.values():
+            s['mean']=s['total']/s['calls']
+        return {'stages':dict(sorted(stages.items(),key=lambda item:-item[1]['total'])),
+                'counters':dict(self.counters)}
+
+    def report(self):                                                           #按总耗时从大到小排列的文字表格
+        summary=self.summary()
+        lines=["%-40s %8s %12s %12s %12s" % ('stage','calls','total ms','mean ms','peak KB')]
+        for name,s in summary['stages'].items():
+            peak='' if s['peak_bytes'] is None else "%.0f" % (s['peak_bytes']/1024)
+            lines.append("%-40s %8d %12.3f %12.3f %12s" % (name,s['calls'],s['total']*1e3,s['mean']*1e3,peak))
+        for name,n in summary['counters'].items():
+            lines.append("%-40s %8d" % (name,n))
+        return "\n".join(lines)
+
+    def chrome_trace(self):
+        """Chrome trace格式（Trace Event Format）：每个阶段为一个完整事件(ph='X')，计数在最后记为计数事件(ph='C')。"""
+        trace=[]
+        for name,start,duration,pid,tid,peak in self.events:
+            event={'name':name,'cat':name.split('.')[0],'ph':'X','ts':start*1e6,'dur':duration*1e6,'pid':pid,'tid':tid}
+            if peak is not None:
+                event['args']={'peak_bytes':peak}
+            trace.append(event)
+        end=max([start+duration for _,start,duration,_,_,_ in self.events],default=0.0)
+        for name,n in self.counters.items():
+            trace.append({'name':name,'ph':'C','ts':end*1e6,'pid':os.getpid(),'args':{'count':n}})
+        return {'traceEvents':trace,'displayTimeUnit':'ms'}
+
+    def save(self,path):                                                        #以.trace.json结尾时写Chrome trace，否则写汇总
+        data=self.chrome_trace() if path.endswith('.trace.json') else self.summary()
+        with open(path,'w',encoding='utf-8') as f:
+            json.dump(data,f,indent=1)
+
+class _Stage():
+    __slots__=('profile','name','start')
+
+    def __init__(self,profile,name):
+        self.profile,self.name=profile,name
+
+    def __enter__(self):
+        self.start=self.profile._enter()
+        return self
+
+    def __exit__(self,*exc):
+        self.profile._exit(self.name,self.start)
+        return False
+
+def stage(name):
+    """计时一段代码：with stage('raster.density'): ...；未开启时为空上下文。"""
+    if _ACTIVE is None:
+        return _NULL
+    return _Stage(_ACTIVE,name)
+
+def timed(name=None):
+    """函数计时的装饰器，名称默认为 模块.函数名；未开启时只多一次判断。"""
+    def decorator(func):
+        stage_name=name or func.__module__+'.'+func.__qualname__
+        @functools.wraps(func)
+        def wrapper(*args,**kwargs):
+            if _ACTIVE is None:
+                return func(*args,**kwargs)
+            with _Stage(_ACTIVE,stage_name):
+                return func(*args,**kwargs)
+        return wrapper
+    return decorator
+
+def count(name,n=1):                                                            #累加计数，如取点数、求交的线段对数
+    if _ACTIVE is not None:
+        _ACTIVE.count(name,int(n))
+
+def enabled():
+    return _ACTIVE is not None
+
+@contextlib.contextmanager
+def profile(track_memory=False):
+    """在with块内开启记录，返回Profile；可以嵌套，退出后恢复外层的记录。"""
+    global _ACTIVE
+    previous=_ACTIVE
+    prof=Profile(track_memory)
+    started=track_memory and not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    _ACTIVE=prof
+    try:
+        yield prof
+    finally:
+        _ACTIVE=previous
+        if started:
+            tracemalloc.stop()
+
+def _from_environment():                                                        #FRACTURE_PROFILE为1时退出时打印表格，为文件名时写入文件
+    path=os.environ.get('FRACTURE_PROFILE','')
+    if path in ('','0'):
+        return
+    global _ACTIVE
+    track_memory=os.environ.get('FRACTURE_PROFILE_MEMORY','') not in ('','0')
+    if track_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _ACTIVE=prof=Profile(track_memory)
+    main_pid=os.getpid()
+
+    def finish():
+        if os.getpid()!=main_pid:                                               #fork出的子进程不写
+            return
+        if path=='1':
+            print(prof.report())
+        else:
+            prof.save(path)
+    atexit.register(finish)
+
+_from_environment()
@@ -0,0 +1,155 @@
+import numpy as np
+from functools import lru_cache
+
+from raster import rasterize
+
+#迹线图比较算法（Han, Li, Wang: A trace map comparison algorithm for the discrete fracture network
+#models of rock masses）的Python实现，对应Code/A-trace-map-comparison-...中的MATLAB程序：
+#   total_gray -> totalgray.m, gray_grade -> grayGrade.m, gray_grade_similarity -> riter.m,
+#   radon_curves -> radonTrs.m, direction_similarity -> yitaDirection.m, loop_cosine -> cosSimu.m
+#输入可以是图片路径、图片数组或Draw图，统一转成迹线为True的布尔图。
+
+def trace_mask(obj,resolution=10,width=1,threshold=200/255):
+    """Draw图按resolution像素/单位画成布尔图；图片中少数一侧（深色或浅色）的像素视为迹线。"""
+    if hasattr(obj,'cracks'):
+        return rasterize(obj.x_max,obj.y_max,obj.cracks.endpoints,obj.cracks.theta,obj.cracks.length,resolution,width)
+    if isinstance(obj,str):
+        from image_ingest import read_image
+        obj=read_image(obj)
+    image=np.asarray(obj)
+    if image.dtype==bool:
+        return image
+    image=image/255 if image.dtype.kind in 'ui' else image.astype(np.float64)
+    if image.ndim==3:
+        image=image[...,:3].mean(axis=2)
+    dark=image<threshold
+    return dark if dark.mean()<=0.5 else ~dark
+
+#灰度----------------------------------------------------------------------------
+def total_gray(mask):                                                           #迹线像素总数
+    return int(np.count_nonzero(mask))
+
+def gray_grade(mask,cells=16,node=0.15,step=0.001):
+    """灰度级配曲线：图片分成cells×cells个网格，grade[i]为迹线像素占比小于(i+1)*step的网格比例。"""
+    h,w=mask.shape[0]//cells,mask.shape[1]//cells
+    blocks=mask[:h*cells,:w*cells].reshape(cells,h,cells,w).sum(axis=(1,3))
+    values=np.sort(blocks.ravel())/(h*w)
+    sieve=np.arange(1,int(round(node/step))+1)*step
+    return np.searchsorted(values,sieve,side='left')/len(values)
+
+def gray_grade_similarity(grade1,grade2,total=None,step=0.001):
+    """两条灰度级配曲线的相似度（riter.m）。
+
+    d为逐点的绝对差，n(x)=1-#(d>=1-x)/total；返回x在[0,1]上按step取值时与n(x)最接近的x（相同时取最小的x）。
+    total默认为曲线的点数；MATLAB程序中写死为73，需要与之逐位一致时传入total=73。
+    """
+    d=np.sort(np.abs(np.asarray(grade1,dtype=np.float64)-np.asarray(grade2,dtype=np.float64)))
+    total=len(d) if total is None else total
+    x=np.arange(int(round(1/step))+1)*step
+    n=1-(len(d)-np.searchsorted(d,1-x,side='left'))/total
+    return float(x[np.argmin(np.abs(n-x))])
+
+#密度Radon变换----------------------------------------------------------------------
+def _projection_index(rows,cols,shape,angles,slice_width):
+    """像素(rows,cols)在各角度下所在切片的编号，(角度数,像素数)；切片沿旋转后的x轴排列。"""
+    rad=np.deg2rad(angles)[:,None]
+    x=cols-(shape[1]-1)/2
+    y=(shape[0]-1)/2-rows
+    s=x*np.cos(rad)-y*np.sin(rad)                                               #逆时针旋转后的横坐标
+    half=np.hypot(shape[0],shape[1])/2
+    return ((s+half)//slice_width).astype(np.int64)
+
+@lru_cache(maxsize=8)
+def _background(shape,angles,slice_width):                                      #画布本身在各切片中的像素数，同样大小的图只算一次
+    rows,cols=np.indices(shape).reshape(2,-1)
+    return _slice_counts(rows,cols,shape,angles,slice_width)
+
+def _slice_counts(rows,cols,shape,angles,slice_width):                          #所有角度的投影用一次bincount算出
+    n_slice=int(np.hypot(shape[0],shape[1])//slice_width)+1
+    index=_projection_index(rows,cols,shape,angles,slice_width)+np.arange(len(angles))[:,None]*n_slice
+    return np.bincount(index.ravel(),minlength=len(angles)*n_slice).reshape(len(angles),n_slice)
+
+def radon_curves(mask,step=15,slice_width=5):
+    """密度Radon变换。
+
+    图片逆时针旋转step,2*step,...,180度，每次按宽slice_width像素的竖直切片统计迹线像素占画布像素的比例，
+    得到每个角度的密度曲线及其标准差。返回(angles,curves,std)，curves为各角度的一维数组。
+    """
+    angles=tuple(range(step,181,step))
+    shape=tuple(mask.shape)
+    rows,cols=np.nonzero(mask)
+    trace=_slice_counts(rows,cols,shape,angles,slice_width)
+    background=_background(shape,angles,slice_width)
+    curves=[t[b>0]/b[b>0] for t,b in zip(trace,background)]
+    std=np.array([np.std(c,ddof=1) if len(c)>1 else 0.0 for c in curves])
+    return np.array(angles),curves,std
+
+def characteristic_directions(angles,std,number=4):
+    """标准差最大的number个旋转角，以及对应的迹线方向（与x轴的夹角，[0,180)）。
+
+    旋转angle度后竖直的迹线原本的方向为90-angle。
+    """
+    order=np.argsort(-std,kind='stable')[:number]
+    return angles[order],np.mod(90-angles[order],180)
+
+def direction_similarity(rotations1,rotations2):
+    """两张图特征方向的相似度（yitaDirection.m）：0.8×匹配比例+0.2×顺序一致性。
+
+    rotations为characteristic_directions按标准差从大到小排列的旋转角。匹配为rotations1[i]==rotations2[j]的(i,j)，
+    匹配比例为匹配数/len(rotations1)；顺序一致性为匹配两两之间i、j同向变化的比例。
+    MATLAB中只有一对匹配时length(q)为2且会越界、少于两对时顺序项为0/0；这里只有一对匹配时顺序项记1，没有匹配时记0。
+    """
+    rotations1,rotations2=np.asarray(rotations1),np.asarray(rotations2)
+    i,j=np.nonzero(rotations1[:,None]==rotations2[None,:len(rotations1)])
+    if len(i)==0:
+        return 0.0
+    if len(i)==1:
+        order=1.0
+    else:
+        a,b=np.triu_indices(len(i),1)
+        order=float(np.mean((i[b]-i[a])*(j[b]-j[a])>0))
+    return float(len(i)/len(rotations1)*0.8+order*0.2)
+
+#循环余弦相似度-----------------------------------------------------------------------
+def loop_cosine(a,b):
+    """b循环平移0..len-2位后与a的余弦相似度的最大值（cosSimu.m，共len-1次平移）。平移用FFT一次算完。
+
+    长度不同时先把b插值到a的长度（MATLAB程序只比较同样大小的图）；曲线全为0或短于2时记0。
+    """
+    a,b=np.asarray(a,dtype=np.float64),np.asarray(b,dtype=np.float64)
+    if len(b)!=len(a):
+        b=np.interp(np.linspace(0,len(b)-1,len(a)),np.arange(len(b)),b)
+    norm=np.linalg.norm(a)*np.linalg.norm(b)
+    if norm==0 or len(a)<2:
+        return 0.0
+    correlation=np.fft.irfft(np.conj(np.fft.rfft(a))*np.fft.rfft(b),len(a))   #correlation[j]=dot(a,roll(b,-j))
+    return float(correlation[:len(a)-1].max()/norm)
+
+#综合相似度------------------------------------------------------------------------------
+def radon_features(obj,resolution=10,width=1,cells=16,step=15,slice_width=5):
+    mask=trace_mask(obj,resolution,width)
+    angles,curves,std=radon_curves(mask,step,slice_width)
+    return {'total':total_gray(mask),
+            'grade':gray_grade(mask,cells),
+            'angles':angles,
+            'curves':curves,
+            'std':std}
+
+def radon_comprasion(obj1,obj2,number=4,**kwargs):
+    """按MATLAB程序mainProcess的步骤比较两张迹线图，obj1为实测图。
+
+    返回{'score','indicators','directions'}，综合得分=0.2*(总灰度+灰度级配)+0.3*(循环余弦+特征方向)。
+    总灰度相似度为1-|a-b|/a（MATLAB中dist即绝对差），小于0时记0；灰度级配见gray_grade_similarity，
+    特征方向见direction_similarity，循环余弦取obj1各特征方向上的曲线。
+    """
+    f1=radon_features(obj1,**kwargs)
+    f2=radon_features(obj2,**kwargs)
+    rot1,dir1=characteristic_directions(f1['angles'],f1['std'],number)
+    rot2,dir2=characteristic_directions(f2['angles'],f2['std'],number)
+    index=[int(np.flatnonzero(f1['angles']==r)[0]) for r in rot1]
+    indicators={'total_gray':max(0.0,1-abs(f1['total']-f2['total'])/f1['total']) if f1['total'] else 0.0,
+                'gray_grade':gray_grade_similarity(f1['grade'],f2['grade']),
+                'loop_cosine':float(np.mean([loop_cosine(f1['curves'][i],f2['curves'][i]) for i in index])),
+                'direction':direction_similarity(rot1,rot2)}
+    score=0.2*(indicators['total_gray']+indicators['gray_grade'])+0.3*(indicators['loop_cosine']+indicators['direction'])
+    return {'score':score,'indicators':indicators,'directions':(dir1,dir2)}
@@ -0,0 +1,177 @@
+import numpy as np
+import warnings
+
+from profiling import timed,count
+
+@timed('raster.sample_segments')
+def sample_segments(x_range,y_range,endpoints,directions,length,magnifier_index1=50):
+    """沿每条裂隙从端点p2出发按1/magnifier_index1步长取点，返回画布内的(N,2)点阵。"""
+    endpoints=np.asarray(endpoints,dtype=np.float64).reshape(-1,2,2)
+    directions=np.asarray(directions,dtype=np.float64)
+    counts=(np.asarray(length,dtype=np.float64)*magnifier_index1).astype(np.int64)+1     #每条裂隙的取点数
+    starts=np.cumsum(counts)-counts
+    j=np.arange(counts.sum())-np.repeat(starts,counts)                          #每个点在所属裂隙中的序号
+    x=np.repeat(endpoints[:,1,0],counts) + j*np.repeat(np.cos(directions),counts)/magnifier_index1
+    y=np.repeat(endpoints[:,1,1],counts) + j*np.repeat(np.sin(directions),counts)/magnifier_index1
+    inside=(x>=0) & (x<x_range) & (y>=0) & (y<y_range)
+    count('raster.points',inside.sum())
+    return np.column_stack((x[inside],y[inside]))
+
+@timed('raster.line2point')
+def line2point(x_range,y_range,experiment_obj,magnifier_index1=50,*argv):
+    cracks=experiment_obj.cracks
+    if argv and argv[0]=='True':
+        rows=cracks.group_slice(argv[1])
+    elif not argv or argv[0]=='False':
+        rows=slice(None)
+    else:
+        warnings.warn("Failed to turn lines to points")
+        return np.empty((0,2))
+    return sample_segments(x_range,y_range,cracks.endpoints[rows],cracks.theta[rows],cracks.length[rows],magnifier_index1)
+
+
+@timed('raster.density')
+def density(x_range,y_range,points,magnifier_index2=0.5):
+
+    size_x,size_y=int(x_range*magnifier_index2),int(y_range*magnifier_index2)
+    z=np.zeros([size_x,size_y])
+    intersection_points=[]                   #收集交点坐标
+    for (x,y) in points:
+        x_cor=int(y*magnifier_index2)
+        y_cor=int(x*magnifier_index2)
+        z[x_cor][y_cor]+=1
+    return z
+
+def _grid_size(x_range,y_range,scale_x,scale_y):                                #覆盖整个画布的网格数，最后一行/列可能不满
+    return int(np.ceil(x_range*scale_x-1e-9)),int(np.ceil(y_range*scale_y-1e-9))
+
+def _segment_pieces(endpoints,x_range,y_range,scale_x,scale_y):
+    """把裂隙裁剪到画布内，并按网格线切成小段。
+
+    网格宽1/scale_x、高1/scale_y。返回每一小段所属的裂隙序号、列号、行号、实际长度和中点坐标。
+    """
+    endpoints=np.asarray(endpoints,dtype=np.float64).reshape(-1,2,2)
+    scale=np.array([scale_x,scale_y],dtype=np.float64)
+    size_x,size_y=_grid_size(x_range,y_range,scale_x,scale_y)
+    a=endpoints[:,0,:]*scale                                                    #换算到网格坐标
+    d=endpoints[:,1,:]*scale-a
+    #Liang-Barsky裁剪到画布[0,x_range]×[0,y_range]
+    t0,t1=np.zeros(len(a)),np.ones(len(a))
+    with np.errstate(divide='ignore',invalid='ignore'):
+        for axis,upper in ((0,x_range*scale_x),(1,y_range*scale_y)):
+            ta,tb=(0-a[:,axis])/d[:,axis],(upper-a[:,axis])/d[:,axis]
+            parallel=d[:,axis]==0
+            outside=parallel & ((a[:,axis]<0) | (a[:,axis]>upper))
+            t0=np.where(parallel,t0,np.maximum(t0,np.minimum(ta,tb)))
+            t1=np.where(parallel,t1,np.minimum(t1,np.maximum(ta,tb)))
+            t1[outside]=-1
+    keep=np.flatnonzero(t1>t0)
+    a,d,t0,t1=a[keep],d[keep],t0[keep],t1[keep]
+    start,end=a+t0[:,None]*d,a+t1[:,None]*d
+    #与竖直/水平网格线的交点参数t
+    seg_ids,ts=[np.arange(len(a)),np.arange(len(a))],[t0,t1]
+    for axis in (0,1):
+        lo,hi=np.minimum(start[:,axis],end[:,axis]),np.maximum(start[:,axis],end[:,axis])
+        first=np.floor(lo)+1
+        counts=np.maximum(np.ceil(hi)-first,0).astype(np.int64)
+        seg=np.repeat(np.arange(len(a)),counts)
+        k=np.arange(counts.sum())-np.repeat(np.cumsum(counts)-counts,counts)
+        line=np.repeat(first,counts)+k
+        seg_ids.append(seg)
+        ts.append((line-a[seg,axis])/d[seg,axis])
+    seg_ids,ts=np.concatenate(seg_ids),np.concatenate(ts)
+    order=np.lexsort((ts,seg_ids))
+    seg_ids,ts=seg_ids[order],ts[order]
+    same=seg_ids[1:]==seg_ids[:-1]
+    seg,t_lo,t_hi=seg_ids[:-1][same],ts[:-1][same],ts[1:][same]
+    mid=a[seg]+(0.5*(t_lo+t_hi))[:,None]*d[seg]
+    col=np.clip(np.floor(mid[:,0]).astype(np.int64),0,size_x-1)
+    row=np.clip(np.floor(mid[:,1]).astype(np.int64),0,size_y-1)
+    count('raster.segment_pieces',len(seg))
+    piece_len=(t_hi-t_lo)*np.hypot(d[seg,0]/scale[0],d[seg,1]/scale[1])         #换回实际长度
+    return keep[seg],col,row,piece_len,mid/scale
+
+@timed('raster.segment_density')
+def segment_density(x_range,y_range,endpoints,magnifier_index2=0.5):
+    """直接由裂隙端点计算每个网格内的迹线长度密度P21（单位面积内的迹线长度）。
+
+    网格边长为1/magnifier_index2，矩阵行号对应y、列号对应x（与density一致）。
+    每条裂隙先裁剪到画布内，再按与网格线的交点切成小段，各段长度累加到所在网格，
+    结果与取点倍数无关。画布边长不是网格边长的整数倍时，最后一行/列网格只计画布内的面积。
+    """
+    size_x,size_y=_grid_size(x_range,y_range,magnifier_index2,magnifier_index2)
+    _,col,row,piece_len,_=_segment_pieces(endpoints,x_range,y_range,magnifier_index2,magnifier_index2)
+    z=np.bincount(row*size_x+col,weights=piece_len,minlength=size_x*size_y)
+    return z.reshape(size_y,size_x)/cell_areas(x_range,y_range,magnifier_index2)
+
+def cell_areas(x_range,y_range,magnifier_index2):                               #segment_density各网格在画布内的面积
+    size_x,size_y=_grid_size(x_range,y_range,magnifier_index2,magnifier_index2)
+    width=np.minimum(1/magnifier_index2,x_range-np.arange(size_x)/magnifier_index2)
+    height=np.minimum(1/magnifier_index2,y_range-np.arange(size_y)/magnifier_index2)
+    return np.outer(height,width)
+
+def block_density(z,areas,block):
+    """把密度矩阵按block×block合并成粗网格：先还原各网格的迹线长度，分块求和后除以分块面积。
+
+    行列数不是block的整数倍时，最后一块只包含剩下的网格。
+    """
+    rows,cols=np.arange(0,z.shape[0],block),np.arange(0,z.shape[1],block)
+    length=np.add.reduceat(np.add.reduceat(z*areas,rows,axis=0),cols,axis=1)
+    area=np.add.reduceat(np.add.reduceat(areas,rows,axis=0),cols,axis=1)
+    return length/area,area
+
+def density_pyramid(z,areas,levels=None):
+    """由最细的密度矩阵逐级按2×2合并，返回[(分块边长, 密度矩阵),...]，分块边长为1,2,4,...个最细网格。
+
+    levels为None时一直合并到只剩一个网格。
+    """
+    pyramid=[(1,z)]
+    block=1
+    while (levels is None or len(pyramid)<levels) and max(z.shape)>1:
+        z,areas=block_density(z,areas,2)
+        block=block*2
+        pyramid.append((block,z))
+    return pyramid
+
+@timed('raster.cell_statistics')
+def cell_statistics(x_range,y_range,density_index,points=None,endpoints=None):
+    """把画布分成density_index×density_index个网格（网格宽x_range/density_index、高y_range/density_index），
+    一次bincount算出每个网格的重心、个数和长度，数组下标为[x方向序号][y方向序号]。
+
+    给出points（(N,2)点阵）时按点统计，count与length都是点数；
+    给出endpoints时按裂隙统计，每条裂隙按网格切段，重心按段长加权，count为穿过该网格的裂隙数，length为网格内的迹线长度。
+    空网格的重心记为(-1,-1)。
+    """
+    scale_x,scale_y=density_index/x_range,density_index/y_range
+    if endpoints is not None:
+        _,col,row,weight,xy=_segment_pieces(endpoints,x_range,y_range,scale_x,scale_y)
+    else:
+        xy=np.asarray(points,dtype=np.float64).reshape(-1,2)
+        col=np.clip((xy[:,0]*scale_x).astype(np.int64),0,density_index-1)
+        row=np.clip((xy[:,1]*scale_y).astype(np.int64),0,density_index-1)
+        weight=np.ones(len(xy))
+    cell=col*density_index+row
+    size=density_index*density_index
+    counts=np.bincount(cell,minlength=size)
+    length=np.bincount(cell,weights=weight,minlength=size)
+    centroid=np.full((size,2),-1.0)
+    filled=length>0
+    for axis in (0,1):
+        centroid[filled,axis]=np.bincount(cell,weights=weight*xy[:,axis],minlength=size)[filled]/length[filled]
+    return {'centroid':centroid.reshape(density_index,density_index,2),
+            'count':counts.reshape(density_index,density_index),
+            'length':length.reshape(density_index,density_index)}
+
+@timed('raster.rasterize')
+def rasterize(x_range,y_range,endpoints,directions,length,resolution=10,width=1):
+    """把裂隙画成(y_range*resolution,x_range*resolution)的布尔图，第0行为画布顶部（与图片一致）。"""
+    size_x,size_y=int(x_range*resolution),int(y_range*resolution)
+    points=sample_segments(x_range,y_range,endpoints,directions,length,2*resolution)  #每个像素至少取到两个点
+    image=np.zeros((size_y,size_x),dtype=bool)
+    col=np.minimum((points[:,0]*resolution).astype(np.int64),size_x-1)
+    row=np.minimum((points[:,1]*resolution).astype(np.int64),size_y-1)
+    image[size_y-1-row,col]=True
+    if width>1:
+        from scipy.ndimage import binary_dilation
+        image=binary_dilation(image,np.ones((width,width),dtype=bool))
+    return image
@@ -0,0 +1,26 @@
+import numpy as np
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from draw import Draw
+
+def _generate_one(args):
+    canvas_size,configs,seed_seq=args
+    crack_map=Draw(canvas_size,seed=seed_seq)
+    crack_map.generate_crack(configs)
+    return crack_map
+
+def generate_realizations(configs,number,seed=None,canvas_size=(100,100),processes=None):
+    """按同一组参数（与Draw.generate_crack的configs相同）生成number张相互独立的裂隙图。
+
+    每张图的随机数流由np.random.SeedSequence(seed).spawn派生，互不相关；
+    第i张图只取决于seed和i，与进程数无关，因此相同seed的结果逐位一致。
+    processes<=1时在当前进程内生成。
+    """
+    seed_seqs=np.random.SeedSequence(seed).spawn(number)
+    tasks=[(canvas_size,configs,seed_seq) for seed_seq in seed_seqs]
+    processes=os.cpu_count() if processes is None else processes
+    if processes>1 and number>1:
+        with ProcessPoolExecutor(processes) as pool:
+            return list(pool.map(_generate_one,tasks,chunksize=max(1,number//(4*processes))))
+    return [_generate_one(task) for task in tasks]
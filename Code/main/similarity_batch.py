@@ -0,0 +1,76 @@
+import numpy as np
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from similarity_metrics import map_features,score_features
+from fracture_io import load_map
+
+#进程池中各子进程共享的特征，由_init_worker设置一次，避免每个任务重复传输
+_FEATURES=None
+_WEIGHTS=None
+
+def _init_worker(features,weights):
+    global _FEATURES,_WEIGHTS
+    _FEATURES,_WEIGHTS=features,weights
+
+def _score_chunk(pairs):
+    return [score_features(_FEATURES[i],_FEATURES[j],_WEIGHTS) for i,j in pairs]
+
+def _features_of(draw_obj,feature_kwargs):
+    if isinstance(draw_obj,(str,os.PathLike)):                                  #save_map保存的图，在子进程中内存映射打开
+        draw_obj=load_map(draw_obj)
+    return map_features(draw_obj,**feature_kwargs)
+
+def similarity_matrix(maps,references=None,weights=None,processes=None,chunk_size=64,**feature_kwargs):
+    """批量计算多张裂隙图之间的综合相似度。
+
+    maps、references中的元素可以是Draw对象，也可以是save_map保存的目录路径。
+    references为None时计算maps两两之间的N×N矩阵（只算上三角再对称填充，对角线为1）；
+    给出references（M张实测图）时计算M×N矩阵，第r行为第r张实测图与各模拟图的相似度。
+    每张图的特征只计算一次，成对的评分分块交给进程池；processes<=1时在当前进程内计算。
+    返回(综合得分矩阵, {指标名: 该指标的矩阵})。
+    """
+    maps=list(maps)
+    references=None if references is None else list(references)
+    all_maps=maps if references is None else references+maps
+    processes=os.cpu_count() if processes is None else processes
+
+    if processes>1:
+        with ProcessPoolExecutor(processes) as pool:
+            features=list(pool.map(_features_of,all_maps,[feature_kwargs]*len(all_maps)))
+    else:
+        features=[_features_of(m,feature_kwargs) for m in all_maps]
+
+    if references is None:
+        n=len(maps)
+        shape=(n,n)
+        pairs=[(i,j) for i in range(n) for j in range(i+1,n)]
+        cells=pairs
+    else:
+        m=len(references)
+        shape=(m,len(maps))
+        pairs=[(r,m+k) for r in range(m) for k in range(len(maps))]
+        cells=[(r,k) for r in range(m) for k in range(len(maps))]
+
+    chunks=[pairs[k:k+chunk_size] for k in range(0,len(pairs),chunk_size)]
+    if processes>1 and len(chunks)>1:
+        with ProcessPoolExecutor(processes,initializer=_init_worker,initargs=(features,weights)) as pool:
+            results=[r for chunk in pool.map(_score_chunk,chunks) for r in chunk]
+    else:
+        _init_worker(features,weights)
+        results=[r for chunk in chunks for r in _score_chunk(chunk)]
+
+    scores=np.ones(shape) if references is None else np.zeros(shape)
+    indicators={}
+    for (row,col),result in zip(cells,results):
+        scores[row,col]=result['score']
+        for name,value in result['indicators'].items():
+            if name not in indicators:
+                indicators[name]=np.ones(shape) if references is None else np.zeros(shape)
+            indicators[name][row,col]=value
+    if references is None:                                                      #对称填充下三角
+        lower=np.tril_indices(shape[0],-1)
+        scores[lower]=scores.T[lower]
+        for matrix in indicators.values():
+            matrix[lower]=matrix.T[lower]
+    return scores,indicators
@@ -0,0 +1,293 @@
+import numpy as np
+import warnings
+
+from raster import line2point,segment_density,cell_statistics,cell_areas,density_pyramid
+from tool import axial_mean,axial_distance
+from distance_kernels import sorted_samples,wasserstein_one_to_many
+from clustering import cluster_points,DEFAULT_MAX_MEMORY
+from scipy.optimize import linear_sum_assignment
+from profiling import timed,count
+
+def gravity_centers(points,size_x,size_y,density_index):                       #每个网格内点的重心，(density_index,density_index,2)
+    return cell_statistics(size_x,size_y,density_index,points=points)['centroid']
+
+@timed('similarity.couple_directions')
+def couple_directions(characteristic_dir1,characteristic_dir2):
+    """由两组特征倾向（角度制）求最优配对，返回与第一组各元素配对的第二组序号（无配对为None）。"""
+    group_num1,group_num2=len(characteristic_dir1),len(characteristic_dir2)
+    size=max(group_num1,group_num2)
+    cost=np.full((size,size),90.0)                                              #虚拟组的代价取最大轴向夹角90°
+    cost[:group_num1,:group_num2]=axial_distance(np.reshape(characteristic_dir1,(-1,1)),
+                                                 np.reshape(characteristic_dir2,(1,-1)))
+    cost=np.nan_to_num(cost,nan=90.0)                                           #空组没有特征倾向
+    count('similarity.coupling_costs',cost.size)                              #最优配对要比较的组对数（含虚拟组）
+    rows,cols=linear_sum_assignment(cost)
+    return tuple(int(c) if c<group_num2 else None for c in cols[:group_num1])
+
+def density_similarity(density_z1,density_z2):                                  #逐格min(a/b,b/a)的平均，任一格为0时该格记0
+    return float(np.mean(ratio_similarity(density_z1,density_z2)))
+
+def ratio_similarity(a,b):                                                      #逐项min(a/b,b/a)，任一为0时记0
+    a,b=np.asarray(a,dtype=np.float64),np.asarray(b,dtype=np.float64)
+    both=(a!=0) & (b!=0)
+    ratio=np.zeros(np.broadcast(a,b).shape)
+    ratio[both]=np.minimum(a[both]/b[both],b[both]/a[both])
+    return ratio
+
+#综合相似度------------------------------------------------------------------------
+DEFAULT_WEIGHTS={'group':1.0,'direction':1.0,'length':1.0,'spacing':1.0,'location':1.0,'density':1.0}
+
+@timed('similarity.map_features')
+def map_features(draw_obj,magnifier_index2=1/15,density_index=6,magnifier_index1=10):
+    """一次性计算一张裂隙图在各指标中要用到的中间数据，供score_features反复使用。"""
+    size_x,size_y=draw_obj.x_max,draw_obj.y_max
+    cracks=draw_obj.cracks
+    points=line2point(size_x,size_y,draw_obj,magnifier_index1,'False',)
+    samples=sorted_samples(draw_obj)
+    return {'size':(size_x,size_y),
+            'group_num':draw_obj.group_num,
+            'directions':samples['directions'],
+            'lengths':samples['lengths'],
+            'set_directions':np.array([axial_mean(d)*180/np.pi for d in draw_obj.get_directions()]),
+            'set_lengths':samples['set_lengths'],
+            'spacing':np.asarray(draw_obj.get_spacing(),dtype=np.float64),
+            'density':segment_density(size_x,size_y,cracks.endpoints,magnifier_index2),
+            'gravity':gravity_centers(points,size_x,size_y,density_index)}
+
+@timed('similarity.score_features')
+def score_features(features1,features2,weights=None):
+    """由两张图的map_features结果计算各项相似度（均归一化到[0,1]，1为完全相同）及加权综合得分。"""
+    weights=dict(DEFAULT_WEIGHTS if weights is None else weights)
+    index=couple_directions(features1['set_directions'],features2['set_directions'])
+    pairs=[(i,j) for i,j in enumerate(index) if j is not None]
+    distances,indicators={},{}
+
+    group_num1,group_num2=features1['group_num'],features2['group_num']
+    indicators['group']=1-abs(group_num1-group_num2)/max(group_num1,group_num2,1)
+
+    distances['direction']=float(wasserstein_one_to_many(features1['directions'],[features2['directions']],180)[0])
+    indicators['direction']=float(max(0.0,1-distances['direction']/90))
+
+    mean_length=0.5*(np.mean(features1['lengths'])+np.mean(features2['lengths']))
+    distances['length']=float(wasserstein_one_to_many(features1['lengths'],[features2['lengths']])[0])
+    distances['length_by_group']=float(np.mean([wasserstein_one_to_many(features1['set_lengths'][i],[features2['set_lengths'][j]])[0]
+                                                for i,j in pairs if len(features1['set_lengths'][i]) and len(features2['set_lengths'][j])] or [np.nan]))
+    indicators['length']=float(np.exp(-distances['length']/mean_length))
+
+    spacing_ratio=[ratio_similarity(features1['spacing'][i],features2['spacing'][j]) for i,j in pairs]
+    indicators['spacing']=float(np.sum(spacing_ratio)/max(group_num1,group_num2,1))   #没有配对的组记0
+
+    if features1['size']==features2['size']:
+        indicators['density']=density_similarity(features1['density'],features2['density'])
+        gravity1,gravity2=features1['gravity'],features2['gravity']
+        empty1,empty2=gravity1[...,0]<0,gravity2[...,0]<0                       #空网格的重心记为(-1,-1)
+        cell=np.hypot(*features1['size'])/len(gravity1)                         #网格对角线长度
+        offset=np.hypot(*(gravity1-gravity2).T).T/cell
+        location=np.where(empty1 & empty2,1.0,np.where(empty1 | empty2,0.0,np.clip(1-offset,0,1)))
+        indicators['location']=float(np.mean(location))
+    else:
+        warnings.warn("CANNOT Compare the density and location of two given crack maps!!")
+        for name in ('density','location'):
+            weights.pop(name,None)
+
+    total=sum(weights.get(name,0) for name in indicators)
+    score=sum(weights.get(name,0)*value for name,value in indicators.items())/total
+    return {'score':float(score),'indicators':indicators,'distances':distances,'coupling':index}
+
+#长度
+#位置
+#间距
+#分组
+
+class similarity_metrics():
+    """两张裂隙图的相似性指标，只做计算、返回数值结果，不依赖matplotlib。
+
+    画图由similarity_comprasion.similarity_analysis在此基础上完成。
+    """
+    def __init__(self,map1,map2):#map is a draw_obj
+        self.map1 = map1
+        self.map2 = map2
+        self.group_num1 = self.map1.group_num
+        self.group_num2 = self.map2.group_num
+
+    def _same_size(self):
+        return self.map1.x_max==self.map2.x_max and self.map1.y_max==self.map2.y_max
+
+    @timed('similarity.score')
+    def score(self,weights=None,**kwargs):
+        """综合相似度。两张图的中间数据各只算一次并缓存，kwargs传给map_features。"""
+        key=tuple(sorted(kwargs.items()))
+        if getattr(self,'_features_key',None)!=key:
+            self._features=(map_features(self.map1,**kwargs),map_features(self.map2,**kwargs))
+            self._features_key=key
+        return score_features(*self._features,weights)
+
+#配对
+    @timed('similarity.group_coupling')
+    def group_coupling(self):
+        """按组的特征倾向（轴向平均角度）配对两张图的裂隙组。
+
+        返回长度为group_num1的元组，第i个元素是与map1第i组配对的map2组号；
+        两图组数不同时多出的组与虚拟组配对，对应位置为None。
+        """
+        characteristic_dir1=[axial_mean(d)*180/np.pi for d in self.map1.get_directions()]
+        characteristic_dir2=[axial_mean(d)*180/np.pi for d in self.map2.get_directions()]
+        min_permutation=couple_directions(characteristic_dir1,characteristic_dir2)
+        return min_permutation
+
+    def group_comprasion(self):
+        group_similarity_index=0.0
+        group_num1 = self.map1.group_num
+        group_num2 = self.map2.group_num
+        group_similarity_index=abs(group_num1-group_num2)/max(group_num1,group_num2)
+        return group_similarity_index
+
+#------------------------------------------------------------------------------------
+#Density_Location
+    @timed('similarity.density_comprasion')
+    def density_comprasion(self,magnifier_index2=0.1):                           #返回两张图的P21密度矩阵
+        if self._same_size():
+            size_x,size_y=self.map1.x_max,self.map1.y_max
+            density_z1=segment_density(size_x,size_y,self.map1.cracks.endpoints,magnifier_index2)
+            density_z2=segment_density(size_x,size_y,self.map2.cracks.endpoints,magnifier_index2)
+            return density_z1,density_z2
+        else:
+            warnings.warn("CANNOT Compare the two given crack maps!!")
+            return None
+
+    @timed('similarity.density_comprasion_by_group')
+    def density_comprasion_by_group(self,magnifier_index2):                     #返回[(组号1,组号2,密度矩阵1,密度矩阵2),...]
+        if self._same_size() and self.group_num1==self.group_num2:              #segment_density支持任意网格边长，不再要求整除画布
+            size_x,size_y=self.map1.x_max,self.map1.y_max
+            index=self.group_coupling()
+            endpoints1=self.map1.get_endpoints()
+            endpoints2=self.map2.get_endpoints()
+            return [(i,index[i],
+                     segment_density(size_x,size_y,endpoints1[i],magnifier_index2),
+                     segment_density(size_x,size_y,endpoints2[index[i]],magnifier_index2))
+                    for i in range(self.group_num1)]
+        warnings.warn("CANNOT Compare the two given crack maps by group!!")
+        return None
+
+    @timed('similarity.density_gravityCenter_comprasion')
+    def density_gravityCenter_comprasion(self,density_index,magnifier_index1):   #返回两张图各网格的重心
+        if self._same_size():
+            size_x,size_y=self.map1.x_max,self.map1.y_max
+            points1=line2point(size_x,size_y,self.map1,magnifier_index1,'False',)
+            points2=line2point(size_x,size_y,self.map2,magnifier_index1,'False',)
+            return (gravity_centers(points1,size_x,size_y,density_index),
+                    gravity_centers(points2,size_x,size_y,density_index))
+        else:
+            warnings.warn("CANNOT Compare the two given crack maps!!")
+            return None
+
+    @timed('similarity.density_gravityCenter_comprasion_by_group')
+    def density_gravityCenter_comprasion_by_group(self,density_index,magnifier_index1):   #返回[(组号1,组号2,重心1,重心2),...]
+        if self._same_size() and self.group_num1==self.group_num2:
+            size_x,size_y=self.map1.x_max,self.map1.y_max
+            index=self.group_coupling()
+            result=[]
+            for i in range(self.group_num1):
+                points1=line2point(size_x,size_y,self.map1,magnifier_index1,'True',i)
+                points2=line2point(size_x,size_y,self.map2,magnifier_index1,'True',index[i])
+                result.append((i,index[i],
+                               gravity_centers(points1,size_x,size_y,density_index),
+                               gravity_centers(points2,size_x,size_y,density_index)))
+            return result
+        else:
+            warnings.warn("CANNOT Compare the two given crack maps!!")
+            return None
+
+    @timed('similarity.density_comprasion_matrix')
+    def density_comprasion_matrix(self,magnifier_index2=1/15):                 #两张图P21密度矩阵的逐格相似度的平均
+        if self._same_size():
+            size_x,size_y=self.map1.x_max,self.map1.y_max
+            density_z1=segment_density(size_x,size_y,self.map1.cracks.endpoints,magnifier_index2)
+            density_z2=segment_density(size_x,size_y,self.map2.cracks.endpoints,magnifier_index2)
+            return density_similarity(density_z1,density_z2)
+        else:
+            warnings.warn("CANNOT Compare the two given crack maps!!")
+            return None
+
+    @timed('similarity.density_comprasion_multiscale')
+    def density_comprasion_multiscale(self,magnifier_index2=1,levels=None):
+        """多尺度密度相似度：在边长1/magnifier_index2的最细网格上算一次密度，再逐级2×2合并。
+
+        返回(各级网格边长, 各级相似度)，两者都是一维数组。
+        """
+        if self._same_size():
+            size_x,size_y=self.map1.x_max,self.map1.y_max
+            areas=cell_areas(size_x,size_y,magnifier_index2)
+            pyramid1=density_pyramid(segment_density(size_x,size_y,self.map1.cracks.endpoints,magnifier_index2),areas,levels)
+            pyramid2=density_pyramid(segment_density(size_x,size_y,self.map2.cracks.endpoints,magnifier_index2),areas,levels)
+            cell=np.array([block/magnifier_index2 for block,_ in pyramid1])
+            return cell,np.array([density_similarity(z1,z2) for (_,z1),(_,z2) in zip(pyramid1,pyramid2)])
+        else:
+            warnings.warn("CANNOT Compare the two given crack maps!!")
+            return None
+
+#------------------------------------------------------------------------------------
+#Direction
+    def directions(self):                                                       #两张图所有裂隙的倾角（角度制，[0,180)，已排序）
+        return sorted_samples(self.map1)['directions'],sorted_samples(self.map2)['directions']
+
+    @timed('similarity.direction_comprasion')
+    def direction_comprasion(self): #map is a draw_obj
+        dir1,dir2=self.directions()
+        WassersteinDistance=float(wasserstein_one_to_many(dir1,[dir2],180)[0])         #倾角是轴向数据，179°与1°相差2°
+        return WassersteinDistance
+
+#------------------------------------------------------------------------------------
+#Spacing
+    @timed('similarity.spacing_comprasion')
+    def spacing_comprasion(self): #配对组间距之比的平均，没有配对的组记0
+        index=self.group_coupling()
+        spacing1=self.map1.get_spacing()
+        spacing2=self.map2.get_spacing()
+        ratio=[ratio_similarity(spacing1[i],spacing2[j]) for i,j in enumerate(index) if j is not None]
+        group_similarity_index=float(np.sum(ratio)/max(self.group_num1,self.group_num2,1))
+        return group_similarity_index
+
+    @timed('similarity.spacing_comprasion_by_group')
+    def spacing_comprasion_by_group(self): #返回按配对顺序排列的两组间距
+        if self.group_num1==self.group_num2:
+            index=self.group_coupling()
+            num_lst1=self.map1.get_spacing()
+            num_lst2_temp=self.map2.get_spacing()
+            num_lst2=[num_lst2_temp[index[i]] for i in range(len(num_lst2_temp))]
+            return np.asarray(num_lst1,dtype=np.float64),np.asarray(num_lst2,dtype=np.float64)
+        else:
+            warnings.warn("CANNOT Compare these two Maps'Spacing")
+            return None
+
+#------------------------------------------------------------------------------------
+#Length
+    def lengths(self):                                                          #两张图所有裂隙的长度（已排序）
+        return sorted_samples(self.map1)['lengths'],sorted_samples(self.map2)['lengths']
+
+    @timed('similarity.length_comprasion')
+    def length_comprasion(self): #map is a draw_obj
+        len1,len2=self.lengths()
+        WassersteinDistance=float(wasserstein_one_to_many(len1,[len2])[0])
+        return WassersteinDistance
+
+    @timed('similarity.length_comprasion_by_group')
+    def length_comprasion_by_group(self): #按倾向配对的各组长度分布之间距离的平均
+        index=self.group_coupling()
+        len_set1=sorted_samples(self.map1)['set_lengths']
+        len_set2=sorted_samples(self.map2)['set_lengths']
+        WassersteinDistance=[wasserstein_one_to_many(len_set1[i],[len_set2[j]])[0] for i,j in enumerate(index) if j is not None]
+        WSD=float(np.nanmean(WassersteinDistance)) if WassersteinDistance else np.nan
+        return WSD
+
+#------------------------------------------------------------------------------------
+#Cluster
+    @timed('similarity.cluster_comprasion')
+    def cluster_comprasion(self,magnifier_index1=1,backend='affinity',max_memory=DEFAULT_MAX_MEMORY,**kwargs):   #返回两张图的聚类结果
+        """backend为clustering.CLUSTERERS中注册的聚类方法（affinity、kmeans、dbscan、hdbscan），
+        kwargs传给该方法；max_memory为聚类允许使用的内存上限（字节）。"""
+        result=[]
+        for draw_obj in (self.map1,self.map2):
+            P=line2point(draw_obj.x_max,draw_obj.y_max,draw_obj,magnifier_index1,'False',)
+            result.append(cluster_points(P,backend,max_memory,**kwargs))
+        return result
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+from scipy.stats import wasserstein_distance
+
+from distance_kernels import wasserstein_one_to_many,wasserstein,axial_wasserstein
+
+def circular_w1(u,v,period):                                                    #逐段计算F_u-F_v，在所有可能的c中取最小
+    u,v=np.sort(np.mod(u,period)),np.sort(np.mod(v,period))
+    x=np.unique(np.concatenate(([0.0,period],u,v)))
+    F=np.searchsorted(u,x[:-1],side='right')/len(u)-np.searchsorted(v,x[:-1],side='right')/len(v)
+    width=np.diff(x)
+    return min(np.sum(np.abs(F-c)*width) for c in F)
+
+@pytest.mark.parametrize('n,m',[(1,1),(1,5),(7,7),(13,4),(50,80)])
+def test_matches_scipy(n,m):
+    rng=np.random.default_rng(n*100+m)
+    u=np.sort(rng.normal(size=n))
+    vs=[np.sort(rng.normal(size=m)),np.sort(rng.exponential(size=m+3)),np.sort(rng.normal(size=m))]
+    expected=[wasserstein_distance(u,v) for v in vs]
+    assert np.allclose(wasserstein_one_to_many(u,vs),expected,rtol=1e-12,atol=1e-12)
+
+def test_equal_sizes_fast_path():
+    rng=np.random.default_rng(1)
+    u=np.sort(rng.uniform(size=30))
+    vs=[np.sort(rng.uniform(size=20)) for _ in range(5)]
+    assert np.allclose(wasserstein_one_to_many(u,vs),[wasserstein_distance(u,v) for v in vs],atol=1e-12)
+
+def test_ties():
+    u=np.array([1.0,1.0,2.0,2.0])
+    vs=[np.array([1.0,2.0]),np.array([2.0,2.0,2.0]),np.array([1.0])]
+    assert np.allclose(wasserstein_one_to_many(u,vs),[wasserstein_distance(u,v) for v in vs],atol=1e-12)
+
+@pytest.mark.parametrize('period',[180,360])
+def test_circular_matches_brute_force(period):
+    rng=np.random.default_rng(period)
+    for n,m in ((1,1),(3,8),(20,20),(40,15)):
+        u=np.sort(rng.uniform(0,period,n))
+        vs=[np.sort(np.mod(rng.normal(c,20,m),period)) for c in (0,period/2,period-5)]
+        expected=[circular_w1(u,v,period) for v in vs]
+        assert np.allclose(wasserstein_one_to_many(u,vs,period),expected,atol=1e-9)
+
+def test_axial_wraps_around():
+    assert axial_wasserstein([179.0],[1.0])==pytest.approx(2.0)
+    assert wasserstein([179.0],[1.0])==pytest.approx(178.0)
+
+@pytest.mark.parametrize('period',[None,180])
+def test_empty_samples_are_nan(period):
+    assert np.isnan(wasserstein_one_to_many([],[[1.0]],period)).all()
+    assert np.isnan(wasserstein_one_to_many([1.0],[[]],period)).all()
+    distance=wasserstein_one_to_many([1.0],[[2.0],[],[1.0,3.0]],period)
+    assert distance.dtype==np.float64
+    assert np.isnan(distance[1])
+    assert distance[[0,2]]==pytest.approx([1.0,1.0])
+    assert wasserstein_one_to_many([1.0],[],period).shape==(0,)
+
+def test_single_value():
+    assert wasserstein_one_to_many([5.0],[[5.0]],180)[0]==0.0
+    assert wasserstein_one_to_many([5.0],[[5.0],[5.0,5.0]])==pytest.approx([0.0,0.0])
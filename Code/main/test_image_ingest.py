@@ -0,0 +1,39 @@
+import os
+import sys
+import numpy as np
+import pytest
+from scipy import ndimage
+
+from image_ingest import read_image,thin,skeleton,trace_segments
+
+SAMPLE=os.path.join(os.path.dirname(os.path.abspath(__file__)),'..','..','Image samples','label','1.png')
+
+@pytest.fixture
+def no_skimage(monkeypatch):                                                    #模拟没有安装scikit-image
+    monkeypatch.setitem(sys.modules,'skimage.morphology',None)
+
+def thick_lines():
+    mask=np.zeros((120,120),dtype=bool)
+    mask[20:26,10:110]=True                                                     #水平
+    rows=np.arange(30,110)
+    for w in range(5):                                                          #斜线
+        mask[rows,rows-20+w]=True
+    return mask
+
+def test_thin_is_one_pixel_wide_and_connected():
+    mask=thick_lines()
+    skel=thin(mask)
+    assert skel.sum()<mask.sum()/3
+    assert not (skel & ~mask).any()
+    neighbours=ndimage.convolve(skel.astype(int),np.ones((3,3),dtype=int),mode='constant')-1
+    assert (neighbours[skel]<=2).mean()>0.99                                    #几乎没有多余的拐角像素
+    assert ndimage.label(skel,structure=np.ones((3,3)))[1]==ndimage.label(mask,structure=np.ones((3,3)))[1]
+
+def test_fallback_skeleton(no_skimage):
+    mask=thick_lines()
+    assert np.array_equal(skeleton(mask.astype(float)),thin(mask))
+
+@pytest.mark.skipif(not os.path.exists(SAMPLE),reason="sample image not available")
+def test_sample_segments_without_skimage(no_skimage):
+    segments,_=trace_segments(read_image(SAMPLE))
+    assert len(segments)>100
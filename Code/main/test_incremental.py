@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from crack import CrackTable
+from draw import Draw
+from incremental import IncrementalMap,_SortedSamples
+
+def random_map(size,number,sets,seed):
+    rng=np.random.default_rng(seed)
+    draw_obj=Draw((size,size))
+    draw_obj.cracks=CrackTable()
+    for k in range(sets):
+        draw_obj.cracks.append_set(rng.uniform(0,size,number),rng.uniform(0,size,number),
+                                   rng.normal(k*np.pi/sets,0.2,number),rng.uniform(1,8,number))
+    draw_obj.spacing_collection=[2.0]*sets
+    return draw_obj
+
+def assert_same_state(a,b):
+    fa,fb=a.features(),b.features()
+    assert fa['size']==fb['size'] and fa['group_num']==fb['group_num']
+    for key in ('directions','lengths','set_directions','spacing','density','gravity'):
+        assert np.allclose(fa[key],fb[key],equal_nan=True),key
+    for u,v in zip(fa['set_lengths'],fb['set_lengths']):
+        assert np.allclose(u,v)
+    assert a.intersection_count==b.intersection_count
+    assert len(a)==len(b)
+
+def test_sorted_samples():
+    rng=np.random.default_rng(0)
+    values=list(rng.uniform(0,10,300))
+    samples=_SortedSamples(np.sort(values[:100]),chunk=8)
+    for v in values[100:]:
+        samples.add(v)
+    for v in values[::3]:
+        samples.remove(v)
+    samples.remove(values[1]+1e-12)                                             #浮点误差时删掉最接近的一项
+    expected=np.sort(np.delete(values,np.r_[np.arange(0,300,3),1]))
+    assert np.array_equal(samples.values(),expected)
+    assert len(samples)==len(expected)
+    assert all(len(b)<=16 for b in samples._blocks)
+
+@pytest.mark.parametrize('same_set',[False,True])
+def test_edits_match_rebuild(same_set):
+    crack_map=IncrementalMap(random_map(60,300,3,1),same_set=same_set)
+    rng=np.random.default_rng(2)
+    ids=list(range(len(crack_map)))
+    for step in range(400):
+        r=rng.random()
+        if r<0.4:
+            ids.append(crack_map.add(*rng.uniform(0,60,2),rng.uniform(0,np.pi),rng.uniform(1,8),int(rng.integers(0,4))))
+        elif r<0.7:
+            crack_map.remove(ids.pop(int(rng.integers(len(ids)))))
+        else:
+            crack_map.move(ids[int(rng.integers(len(ids)))],x=rng.uniform(0,60),theta=rng.uniform(0,np.pi))
+        if step%100==99:
+            assert_same_state(crack_map,IncrementalMap(crack_map.to_draw(),same_set=same_set))
+    assert crack_map.group_num==4
+
+def test_build_matches_adding_one_by_one():
+    draw_obj=random_map(60,200,3,4)
+    built=IncrementalMap(draw_obj)
+    empty=Draw((60,60))
+    empty.cracks=CrackTable()
+    added=IncrementalMap(empty,cell_size=built.cell_size)
+    cracks=draw_obj.cracks
+    for i in range(len(cracks)):
+        added.add(cracks.x[i],cracks.y[i],cracks.theta[i],cracks.length[i],int(cracks.set_id[i]))
+    added.spacing=list(built.spacing)                                           #新建组的间距记为nan，这里换成原图的间距
+    assert_same_state(built,added)
+    assert built.intersection_count>0
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from crack import CrackTable
+from intersection import intersect,find_intersections,candidate_pairs
+
+def make_table():
+    """三组裂隙：竖直、水平、共线相接、T形相接、跨越多个网格的长裂隙，以及随机裂隙。"""
+    rng=np.random.default_rng(7)
+    sets=[
+        #(x,y,theta,length)
+        [(5.0,5.0,np.pi/2,6.0),(10.0,5.0,np.pi/2,10.0),(2.0,2.0,0.0,4.0),(6.0,2.0,0.0,4.0),     #竖直、共线相接的水平线
+         (15.0,15.0,np.pi/4,28.0)],                                                              #跨越整个画布
+        [(5.0,5.0,0.0,8.0),(10.0,10.0,0.0,1.0),(10.0,0.0,0.0,6.0),(3.0,6.0,0.0,4.0),           #水平，端点落在竖直线上
+         (20.0,20.0,3*np.pi/4,28.0)],
+        list(zip(rng.uniform(0,20,40),rng.uniform(0,20,40),rng.uniform(0,np.pi,40),rng.uniform(0.5,8,40))),
+    ]
+    table=CrackTable()
+    for rows in sets:
+        x,y,theta,length=np.array(rows).T
+        table.append_set(x,y,theta,length)
+    return table
+
+def brute_force(table,same_set):
+    points,pairs=[],[]
+    for i in range(len(table)):
+        for j in range(i+1,len(table)):
+            if not same_set and table.set_id[i]==table.set_id[j]:
+                continue
+            crossing,x,y=intersect(table.crack(i),table.crack(j))
+            if crossing:
+                points.append((x,y))
+                pairs.append((i,j))
+    return np.array(points).reshape(-1,2),np.array(pairs,dtype=np.int64).reshape(-1,2)
+
+def _sorted(points,pairs):
+    order=np.lexsort((pairs[:,1],pairs[:,0]))
+    return points[order],pairs[order]
+
+@pytest.mark.parametrize('same_set',[False,True])
+@pytest.mark.parametrize('cell_size',[None,0.5,3.0,100.0])
+def test_matches_all_pairs(same_set,cell_size):
+    table=make_table()
+    expected_points,expected_pairs=brute_force(table,same_set)
+    points,pairs=_sorted(*find_intersections(table,same_set,cell_size))
+    assert len(expected_pairs)>0
+    assert np.array_equal(pairs,expected_pairs)
+    assert np.allclose(points,expected_points)
+
+def test_touching_and_collinear():
+    table=make_table()
+    _,pairs=find_intersections(table,same_set=True)
+    pairs={tuple(p) for p in pairs.tolist()}
+    assert (0,8) in pairs                                                       #水平线的端点落在竖直线中部（T形）
+    assert (1,7) in pairs                                                       #端点落在另一条裂隙的端点上
+    assert (0,5) in pairs                                                       #竖直线与水平线交叉
+    assert (2,3) not in pairs                                                   #共线相接不算相交
+
+def test_candidate_pairs_cover_all_bounding_box_overlaps():
+    endpoints=make_table().endpoints
+    lo,hi=endpoints.min(axis=1),endpoints.max(axis=1)
+    expected={(i,j) for i in range(len(lo)) for j in range(i+1,len(lo))
+              if np.all(lo[i]<=hi[j]) and np.all(lo[j]<=hi[i])}
+    for cell_size in (None,0.5,3.0):
+        assert {tuple(p) for p in candidate_pairs(endpoints,cell_size).tolist()}==expected
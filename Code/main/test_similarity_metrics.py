@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from itertools import permutations
+
+from crack import CrackTable
+from draw import Draw
+from similarity_metrics import couple_directions,similarity_metrics
+
+def brute_force_cost(dir1,dir2):
+    """原来的做法：枚举所有排列，组数不同时用虚拟组补齐（夹角记90°），返回最小的总夹角。"""
+    size=max(len(dir1),len(dir2))
+    best=np.inf
+    for perm in permutations(range(size)):
+        cost=0.0
+        for i,j in enumerate(perm):
+            if i<len(dir1) and j<len(dir2):
+                diff=abs(dir1[i]-dir2[j])%180
+                cost+=min(diff,180-diff)
+            else:
+                cost+=90.0
+        best=min(best,cost)
+    return best
+
+def coupling_cost(dir1,dir2,index):
+    size=max(len(dir1),len(dir2))
+    cost=90.0*(size-sum(j is not None for j in index))                         #与虚拟组配对的组
+    for i,j in enumerate(index):
+        if j is not None:
+            diff=abs(dir1[i]-dir2[j])%180
+            cost+=min(diff,180-diff)
+    return cost
+
+@pytest.mark.parametrize('k1,k2',[(1,1),(2,2),(3,3),(4,4),(5,5),(2,4),(4,2),(1,5),(5,3)])
+def test_matches_permutation_search(k1,k2):
+    rng=np.random.default_rng(10*k1+k2)
+    for _ in range(20):
+        dir1,dir2=rng.uniform(0,180,k1),rng.uniform(0,180,k2)
+        index=couple_directions(dir1,dir2)
+        assert len(index)==k1
+        matched=[j for j in index if j is not None]
+        assert len(matched)==len(set(matched))==min(k1,k2)
+        assert coupling_cost(dir1,dir2,index)==pytest.approx(brute_force_cost(dir1,dir2))
+
+def test_axial_wrap():
+    assert couple_directions([175.0,90.0],[92.0,5.0])==(1,0)                    #175°与5°只差10°
+    assert couple_directions([1.0],[179.0,60.0])==(0,)
+
+def test_unequal_group_counts():
+    assert couple_directions([10.0,100.0,50.0],[52.0])==(None,None,0)
+    assert couple_directions([50.0],[10.0,100.0,52.0])==(2,)
+    assert couple_directions([],[10.0])==()
+    assert couple_directions([10.0],[])==(None,)
+
+def make_map(directions):                                                       #每组3条平行裂隙，倾角为角度制
+    draw_obj=Draw((50,50))
+    draw_obj.cracks=CrackTable()
+    for theta in directions:
+        draw_obj.cracks.append_set([10.0,25.0,40.0],[25.0,25.0,25.0],np.full(3,np.deg2rad(theta)),[5.0,5.0,5.0])
+    return draw_obj
+
+def test_group_coupling():
+    metrics=similarity_metrics(make_map([175.0,60.0,120.0]),make_map([118.0,5.0]))
+    assert metrics.group_coupling()==(1,None,0)
+    metrics=similarity_metrics(make_map([5.0]),make_map([170.0,90.0]))
+    assert metrics.group_coupling()==(0,)